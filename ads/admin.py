@@ -1,21 +1,26 @@
 # ads/admin.py
 
 from django.contrib import admin
-from .models import Ad
+from django.db.models import Sum
+from .models import Ad, AdStat
 
 @admin.register(Ad)
 class AdAdmin(admin.ModelAdmin):
     """
     Customizes the display and functionality of the Ad model in the Django admin.
     """
-    list_display = ('name', 'slug', 'is_active', 'created_at', 'updated_at') # Fields to display in the list view
-    list_filter = ('is_active', 'created_at', 'updated_at') # Filters on the right sidebar
+    list_display = ('name', 'slug', 'slot', 'weight', 'frequency_cap', 'target_url', 'is_active', 'created_at', 'updated_at') # Fields to display in the list view
+    list_filter = ('is_active', 'slot', 'created_at', 'updated_at') # Filters on the right sidebar
     search_fields = ('name', 'ad_content', 'slug') # Fields to search by
     prepopulated_fields = {'slug': ('name',)} # Automatically populate slug from name
     readonly_fields = ('created_at', 'updated_at') # Make these fields read-only in the admin form
     fieldsets = (
         (None, {
-            'fields': ('name', 'slug', 'ad_content', 'is_active')
+            'fields': ('name', 'slug', 'ad_content', 'target_url', 'is_active')
+        }),
+        ('Rotation', {
+            'fields': ('slot', 'weight', 'frequency_cap'),
+            'description': "Active ads in the same slot take turns in proportion to their weights."
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -23,3 +28,41 @@ class AdAdmin(admin.ModelAdmin):
         }),
     )
 
+
+@admin.register(AdStat)
+class AdStatAdmin(admin.ModelAdmin):
+    """
+    Read-only daily ad stats, with a click-through report per slot over the
+    filtered rows above the list.
+    """
+    change_list_template = 'admin/ads/adstat/change_list.html'
+    list_display = ('day', 'ad', 'slot', 'impressions', 'clicks', 'ctr_display')
+    list_filter = ('slot', 'ad')
+    date_hierarchy = 'day'
+    list_select_related = ('ad',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='CTR')
+    def ctr_display(self, obj):
+        return f"{obj.ctr:.2f}%" if obj.ctr is not None else '-'
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        changelist = getattr(response, 'context_data', {}).get('cl')
+        if changelist is None:
+            return response  # e.g. a redirect after an action
+
+        report = list(
+            changelist.queryset.order_by().values('slot').annotate(
+                impressions=Sum('impressions'), clicks=Sum('clicks')
+            ).order_by('slot')
+        )
+        for row in report:
+            row['ctr'] = f"{row['clicks'] * 100 / row['impressions']:.2f}%" if row['impressions'] else '-'
+        response.context_data['slot_report'] = report
+        return response
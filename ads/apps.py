@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AdsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ads'
+
+    def ready(self):
+        # Registers the ad event counter for flush_counters
+        import ads.tracking  # noqa: F401
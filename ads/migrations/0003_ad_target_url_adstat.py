@@ -0,0 +1,37 @@
+# Generated by Django 4.2.13 on 2026-10-18 16:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0002_alter_ad_options_remove_ad_alt_text_remove_ad_clicks_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='target_url',
+            field=models.URLField(blank=True, help_text='Where a click on the ad leads; clicks are then counted. Leave blank for ads whose code handles clicks itself.'),
+        ),
+        migrations.CreateModel(
+            name='AdStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.SlugField()),
+                ('day', models.DateField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='ads.ad')),
+            ],
+            options={
+                'verbose_name': 'Ad Stat',
+                'verbose_name_plural': 'Ad Stats',
+                'ordering': ['-day', 'slot'],
+                'indexes': [models.Index(fields=['day'], name='ads_adstat_day_109913_idx')],
+                'unique_together': {('ad', 'slot', 'day')},
+            },
+        ),
+    ]
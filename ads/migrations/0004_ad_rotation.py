@@ -0,0 +1,28 @@
+# Generated by Django 4.2.13 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ads', '0003_ad_target_url_adstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ad',
+            name='frequency_cap',
+            field=models.PositiveIntegerField(blank=True, help_text='Most times a day one visitor sees this ad. Leave blank for no cap.', null=True),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='slot',
+            field=models.SlugField(blank=True, help_text="The template slot the ad is shown in (e.g., 'header1'). Leave blank to use the slug."),
+        ),
+        migrations.AddField(
+            model_name='ad',
+            name='weight',
+            field=models.PositiveIntegerField(default=1, help_text="Share of the slot's views relative to the other active ads in it. 0 pauses the ad."),
+        ),
+    ]
@@ -8,6 +8,8 @@ class Ad(models.Model):
     Model to store advertisement content.
     Each ad has a name, a unique slug for easy referencing in templates,
     the actual HTML/JavaScript content of the ad, and an active status.
+    Active ads sharing a slot rotate in proportion to their weights
+    (see ads.rotation).
     """
     name = models.CharField(
         max_length=255,
@@ -23,6 +25,25 @@ class Ad(models.Model):
     ad_content = models.TextField(
         help_text="The full HTML or JavaScript code for the advertisement."
     )
+    target_url = models.URLField(
+        blank=True,
+        help_text="Where a click on the ad leads; clicks are then counted. Leave blank for ads whose code handles clicks itself."
+    )
+    slot = models.SlugField(
+        max_length=50,
+        blank=True,
+        db_index=True,
+        help_text="The template slot the ad is shown in (e.g., 'header1'). Leave blank to use the slug."
+    )
+    weight = models.PositiveIntegerField(
+        default=1,
+        help_text="Share of the slot's views relative to the other active ads in it. 0 pauses the ad."
+    )
+    frequency_cap = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Most times a day one visitor sees this ad. Leave blank for no cap."
+    )
     is_active = models.BooleanField(
         default=True,
         help_text="Check to display this ad on the website. Uncheck to temporarily hide it."
@@ -47,6 +68,11 @@ class Ad(models.Model):
         """
         return self.name
 
+    @property
+    def slot_name(self):
+        """The slot the ad is shown in."""
+        return self.slot or self.slug
+
     def save(self, *args, **kwargs):
         """
         Overrides the save method to automatically generate a slug if one is not provided.
@@ -62,3 +88,31 @@ class Ad(models.Model):
             counter += 1
         super().save(*args, **kwargs)
 
+
+class AdStat(models.Model):
+    """
+    Impressions and clicks of one ad in one slot (e.g. 'header1') on one day.
+    Rows are written in batches by the ad event counter (ads.tracking).
+    """
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='stats')
+    slot = models.SlugField(max_length=50)
+    day = models.DateField()
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('ad', 'slot', 'day')
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+        ordering = ['-day', 'slot']
+        verbose_name = "Ad Stat"
+        verbose_name_plural = "Ad Stats"
+
+    def __str__(self):
+        return f"{self.ad_id} in {self.slot} on {self.day}: {self.impressions} impressions, {self.clicks} clicks"
+
+    @property
+    def ctr(self):
+        """Click-through rate in percent, or None without impressions."""
+        return self.clicks * 100 / self.impressions if self.impressions else None
@@ -0,0 +1,94 @@
+# ads/registry.py
+"""
+The active ads, held in each worker's memory.
+
+Ads change a few times a week but are shown on every page, so each worker
+loads them once and keeps them until the shared 'ads' version stamp moves
+(bumped by core.signals whenever an Ad is saved or deleted). The stamp is
+checked at most every AD_REGISTRY_CHECK_INTERVAL seconds, so rendering an
+ad slot or following an ad click normally costs neither a query nor a cache
+round trip, and every worker picks up an edit within that interval.
+
+A load also builds the rotation of each slot (ads.rotation), so the alias
+tables are only rebuilt when an ad changes.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+
+from core.caching import get_version
+
+from .models import Ad
+from .rotation import SlotRotation
+
+logger = logging.getLogger(__name__)
+
+ADS_NAMESPACE = 'ads'
+
+RegisteredAd = namedtuple('RegisteredAd', 'id content target_url weight frequency_cap')
+
+
+class AdRegistry:
+    def __init__(self):
+        self.by_slot = {}
+        self.by_id = {}
+        self.varies = False
+        self.version = None
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        ads = Ad.objects.filter(is_active=True).order_by('pk').values_list(
+            'slug', 'slot', 'id', 'ad_content', 'target_url', 'weight', 'frequency_cap'
+        )
+        by_slot = defaultdict(list)
+        by_id = {}
+        for slug, slot, *fields in ads:
+            ad = RegisteredAd(*fields)
+            by_id[ad.id] = ad
+            if ad.weight:
+                by_slot[slot or slug].append(ad)
+        self.by_slot = {slot: SlotRotation(slot_ads) for slot, slot_ads in by_slot.items()}
+        self.by_id = by_id
+        self.varies = any(rotation.varies for rotation in self.by_slot.values())
+
+    def refresh(self):
+        """Reload if the shared version moved; checked once per interval."""
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < settings.AD_REGISTRY_CHECK_INTERVAL:
+            return
+        with self.lock:
+            if self.checked_at is not None and now - self.checked_at < settings.AD_REGISTRY_CHECK_INTERVAL:
+                return
+            version = get_version(ADS_NAMESPACE)
+            if version != self.version:
+                try:
+                    self.load()
+                except Exception as e:
+                    # Keep serving the ads we have; retry on the next check
+                    logger.error(f"Could not load ads: {e}")
+                    self.checked_at = now
+                    return
+                self.version = version
+            self.checked_at = now
+
+    def rotation(self, slot):
+        """The slot's SlotRotation (ads.rotation), or None when it has no active ads."""
+        self.refresh()
+        return self.by_slot.get(slot)
+
+    def ad(self, pk):
+        """The active ad with this id as a RegisteredAd, or None."""
+        self.refresh()
+        return self.by_id.get(pk)
+
+    def any_varies(self):
+        """Whether any slot shows a different ad from response to response."""
+        self.refresh()
+        return self.varies
+
+
+registry = AdRegistry()
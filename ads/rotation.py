@@ -0,0 +1,88 @@
+# ads/rotation.py
+"""
+Weighted ad rotation and per-visitor frequency caps.
+
+Several active ads can share a slot; each response picks one with
+probability proportional to its weight. The registry (ads.registry) builds
+an alias table per slot whenever the ads change, so a pick is one random
+index and one coin flip however many creatives rotate through the slot.
+
+Frequency caps need no database or cache lookup: the page script counts how
+often the visitor saw each capped ad today in a cookie ("<ad id>.<views>"
+pairs joined by '-', expiring at midnight), which is only read here.
+Responses never set it, so pages stay cacheable.
+
+A slot with several ads, or a capped one, looks different from response to
+response (SlotRotation.varies). Pages showing one are not revalidated with
+304s (core.pagecache) nor marked publicly cacheable (core.middleware).
+"""
+import random
+
+FREQUENCY_COOKIE = 'adfc'  # written by the ad script in core/base.html
+MAX_DRAWS = 8
+MAX_COOKIE_ADS = 50
+
+
+class AliasTable:
+    """Vose's alias method: O(n) to build, O(1) per weighted draw."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        scaled = [weight * n / total for weight in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+        # Whatever is left has probability 1 (up to rounding)
+
+    def draw(self, rng=random):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class SlotRotation:
+    """The ads of one slot and their alias table."""
+
+    def __init__(self, ads):
+        self.ads = ads
+        self.table = AliasTable([ad.weight for ad in ads])
+        self.varies = len(ads) > 1 or any(ad.frequency_cap for ad in ads)
+
+    def choose(self, seen=None):
+        """
+        Pick an ad by weight, skipping ads the visitor has seen as often as
+        their frequency cap allows. None when every ad is capped.
+        """
+        def allowed(ad):
+            return not (seen and ad.frequency_cap and seen.get(ad.id, 0) >= ad.frequency_cap)
+
+        for _ in range(MAX_DRAWS):
+            ad = self.ads[self.table.draw()]
+            if allowed(ad):
+                return ad
+        # Mostly capped: choose among the rest directly
+        remaining = [ad for ad in self.ads if allowed(ad)]
+        if not remaining:
+            return None
+        return random.choices(remaining, weights=[ad.weight for ad in remaining])[0]
+
+
+def seen_counts(request):
+    """{ad id: times seen today} from the frequency cookie, parsed once per request."""
+    counts = getattr(request, '_ad_seen_counts', None)
+    if counts is None:
+        counts = {}
+        for pair in request.COOKIES.get(FREQUENCY_COOKIE, '').split('-')[:MAX_COOKIE_ADS]:
+            ad_id, _, count = pair.partition('.')
+            if ad_id.isdigit() and count.isdigit():
+                counts[int(ad_id)] = int(count)
+        request._ad_seen_counts = counts
+    return counts
@@ -1,3 +1,85 @@
-from django.test import TestCase
+import random
+import tempfile
+from collections import Counter
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .models import Ad, AdStat
+from .registry import RegisteredAd
+from .rotation import FREQUENCY_COOKIE, AliasTable, SlotRotation, seen_counts
+from .tracking import ad_events
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AdTrackingTests(TestCase):
+    """Beacon impressions and clicks end up in AdStat rows (ads.tracking)."""
+
+    def setUp(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        settings_override = override_settings(COUNTER_SPOOL_DIR=spool.name, COUNTER_SPOOL_INTERVAL=3600)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.ad = Ad.objects.create(name='Banner', slug='header1', ad_content='<b>Banner</b>')
+
+    def test_events_are_counted_per_slot(self):
+        url = reverse('ads:ad_impressions')
+        self.client.get(url, {'ads': f'{self.ad.pk}:header1'})
+        self.client.get(url, {'ads': f'{self.ad.pk}:header1'})
+        self.client.get(reverse('ads:ad_click', args=[self.ad.pk]), {'slot': 'header1'})
+        ad_events.flush()
+
+        stat = AdStat.objects.get()
+        self.assertEqual((stat.ad, stat.slot, stat.impressions, stat.clicks), (self.ad, 'header1', 2, 1))
+
+    @override_settings(AD_REGISTRY_CHECK_INTERVAL=0)
+    def test_clicks_are_resolved_from_the_registry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ad = Ad.objects.create(name='Sponsor', slug='header2', ad_content='<b>Sponsor</b>',
+                                   target_url='https://example.com/')
+        url = reverse('ads:ad_click', args=[ad.pk])
+        self.client.get(url)  # loads the registry
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertRedirects(response, 'https://example.com/', fetch_redirect_response=False)
+
+        # Switched off since the page was served: looked up in the database
+        with self.captureOnCommitCallbacks(execute=True):
+            ad.is_active = False
+            ad.save()
+        response = self.client.get(url)
+        self.assertRedirects(response, 'https://example.com/', fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('ads:ad_click', args=[ad.pk + 1])).status_code, 404)
+
+    def test_forged_slots_are_dropped(self):
+        self.client.get(reverse('ads:ad_impressions'), {'ads': f'{self.ad.pk}:whatever-slot,999:header1'})
+        self.client.get(reverse('ads:ad_click', args=[self.ad.pk]), {'slot': 'made-up'})
+        ad_events.flush()
+
+        self.assertFalse(AdStat.objects.exists())
+
+
+class RotationTests(SimpleTestCase):
+    """Weighted picks and frequency caps (ads.rotation)."""
+
+    def test_draws_follow_the_weights(self):
+        table = AliasTable([1, 2, 7])
+        rng = random.Random(1)
+        draws = Counter(table.draw(rng) for _ in range(100000))
+        for index, share in enumerate([0.1, 0.2, 0.7]):
+            self.assertAlmostEqual(draws[index] / 100000, share, delta=0.01)
+
+    def test_capped_ads_are_skipped(self):
+        plain = RegisteredAd(1, 'A', '', 1, None)
+        capped = RegisteredAd(2, 'B', '', 9, 2)
+        rotation = SlotRotation([plain, capped])
+        self.assertTrue(rotation.varies)
+        self.assertEqual({rotation.choose({2: 2}) for _ in range(200)}, {plain})
+        self.assertIsNone(SlotRotation([capped]).choose({2: 5}))
+
+    def test_seen_counts_ignore_malformed_pairs(self):
+        request = RequestFactory().get('/')
+        request.COOKIES[FREQUENCY_COOKIE] = '3.2-x.1-4.-7.5'
+        self.assertEqual(seen_counts(request), {3: 2, 7: 5})
@@ -0,0 +1,90 @@
+# ads/tracking.py
+"""
+Ad impression and click tracking.
+
+Every rendered ad slot is wrapped in a tagged element (slot_html()); a small
+script in the base template reports the ads a page showed in one beacon
+request, and ads with a target URL link through the click redirect. Both
+only record the event in the buffered ad_events counter (see
+core.counters), so the request path never writes to the database. A flush
+adds the totals to the per-ad, per-slot, per-day AdStat rows.
+"""
+import re
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from core.counters import BufferedCounter
+
+from .models import Ad, AdStat
+
+IMPRESSION = 'i'
+CLICK = 'c'
+FIELDS = {IMPRESSION: 'impressions', CLICK: 'clicks'}
+
+SLOT_RE = re.compile(r'^[\w-]{1,50}$')
+MAX_BEACON_IMPRESSIONS = 20
+
+
+def valid_slot(slot):
+    return bool(slot) and SLOT_RE.match(slot) is not None
+
+
+class AdEventCounter(BufferedCounter):
+    """Ad impressions and clicks, keyed by event, ad, slot and day."""
+
+    def record(self, event, ad_id, slot):
+        self.incr(f"{event}:{ad_id}:{slot}:{timezone.localdate().isoformat()}")
+
+    def apply(self, totals):
+        counts = defaultdict(Counter)
+        for key, amount in totals.items():
+            event, ad_id, slot, day = key.split(':')
+            counts[(int(ad_id), slot, date.fromisoformat(day))][FIELDS[event]] += amount
+
+        # Slots come from the client: keep only events of live ads in the slot
+        # they are shown in, so forged slots never become AdStat rows
+        ads = Ad.objects.filter(pk__in={ad_id for ad_id, _, _ in counts}).only('slug', 'slot')
+        slots = {ad.pk: ad.slot_name for ad in ads}
+        counts = {key: fields for key, fields in counts.items() if slots.get(key[0]) == key[1]}
+
+        existing = set(
+            AdStat.objects.filter(
+                ad_id__in={ad_id for ad_id, _, _ in counts},
+                day__in={day for _, _, day in counts},
+            ).values_list('ad_id', 'slot', 'day')
+        )
+
+        # A handful of ads and slots: one UPDATE per existing row is cheap
+        new_rows = []
+        for (ad_id, slot, day), fields in sorted(counts.items()):
+            if (ad_id, slot, day) in existing:
+                AdStat.objects.filter(ad_id=ad_id, slot=slot, day=day).update(
+                    **{field: F(field) + amount for field, amount in fields.items()}
+                )
+            else:
+                new_rows.append(AdStat(ad_id=ad_id, slot=slot, day=day, **fields))
+        AdStat.objects.bulk_create(new_rows, batch_size=500)
+
+
+ad_events = AdEventCounter('ad_events')
+
+
+def slot_html(ad, slot):
+    """
+    The markup of a registered ad (ads.registry) shown in a slot: tagged for
+    the impression beacon and, when the ad has a target URL, linked through
+    the click redirect. Capped ads are marked so the page script counts
+    their views for the frequency cookie (see ads.rotation).
+    """
+    content = mark_safe(ad.content)
+    if ad.target_url:
+        click_url = f"{reverse('ads:ad_click', args=[ad.id])}?slot={slot}"
+        content = format_html('<a href="{}" rel="sponsored noopener" target="_blank">{}</a>', click_url, content)
+    cap = mark_safe(' data-ad-cap') if ad.frequency_cap else ''
+    return format_html('<div class="ad-unit" data-ad="{}" data-ad-slot="{}"{}>{}</div>', ad.id, slot, cap, content)
@@ -7,4 +7,8 @@ app_name = 'ads' # Namespace for your ad app URLs
 urlpatterns = [
     # URL for tracking ad clicks
     path('click/<int:pk>/', views.ad_click_track, name='ad_click'),
+    # Impression beacon (see ads.tracking)
+    path('impressions/', views.ad_impressions, name='ad_impressions'),
+    # Ad slots of pre-rendered pages (see core.fragments.render_ad)
+    path('slots/', views.ad_slots, name='ad_slots'),
 ]
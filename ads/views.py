@@ -1,20 +1,61 @@
 # ads/views.py
 from django.shortcuts import get_object_or_404, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from .models import Ad
+from .registry import registry
+from .rotation import seen_counts
+from .tracking import CLICK, IMPRESSION, MAX_BEACON_IMPRESSIONS, ad_events, slot_html, valid_slot
 
 def ad_click_track(request, pk):
     """
-    Tracks an ad click and redirects to the ad's target URL.
+    Counts an ad click (see ads.tracking) and redirects to the ad's target URL.
     """
-    ad = get_object_or_404(Ad, pk=pk)
-    ad.clicks += 1
-    ad.save()
+    # Active ads come from the worker's registry; only clicks on ads switched
+    # off since the page was served reach the database
+    ad = registry.ad(pk)
+    if ad is not None:
+        target_url = ad.target_url
+    else:
+        target_url = get_object_or_404(Ad.objects.values_list('target_url', flat=True), pk=pk)
+    slot = request.GET.get('slot', '')
+    if valid_slot(slot):
+        ad_events.record(CLICK, pk, slot)
 
-    if ad.target_url:
-        return redirect(ad.target_url)
+    if target_url:
+        return redirect(target_url)
     else:
         # If no target_url, maybe redirect to homepage or show a message
         return HttpResponse("Ad clicked, but no target URL specified.", status=200)
 
-# You might add other views here later, e.g., for impression tracking via AJAX
+@csrf_exempt
+@never_cache
+@require_http_methods(['GET', 'POST'])
+def ad_impressions(request):
+    """
+    Impression beacon sent once per page view: ?ads=<ad id>:<slot>,...
+    Only counted in memory; unknown ads are dropped when the counts are flushed.
+    """
+    for item in request.GET.get('ads', '').split(',')[:MAX_BEACON_IMPRESSIONS]:
+        ad_id, _, slot = item.partition(':')
+        if ad_id.isdigit() and valid_slot(slot):
+            ad_events.record(IMPRESSION, int(ad_id), slot)
+    return HttpResponse(status=204)
+
+@never_cache
+def ad_slots(request):
+    """
+    The markup of ad slots for pre-rendered pages, which leave them to the
+    page script: ?slots=header1,sidebar1 -> {slot: html}. Picked like a
+    server-rendered slot (weights and frequency caps), without queries.
+    """
+    seen = seen_counts(request)
+    html = {}
+    for slot in request.GET.get('slots', '').split(',')[:MAX_BEACON_IMPRESSIONS]:
+        rotation = registry.rotation(slot) if valid_slot(slot) else None
+        ad = rotation.choose(seen) if rotation is not None else None
+        if ad is not None:
+            html[slot] = slot_html(ad, slot)
+    return JsonResponse(html)
@@ -154,6 +154,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.LazyContextMiddleware',
+    'core.middleware.SessionFreeAnonymousMiddleware',
 ]
 
 ROOT_URLCONF = 'blog_project.urls'
@@ -169,14 +171,18 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.global_sidebar_context',
-                'core.context_processors.trending_posts_processor',
-                'ads.context_processors.ads_context',
                 'core.context_processors.site_settings', 
             ],
         },
     },
 ]
 
+# Templates under these subdirectories of DIRS are compiled into the cached
+# loader when a worker boots (core.warmup), so its first request is not
+# slowed by parsing them. `manage.py warm_templates` reports parse times.
+TEMPLATE_WARMUP_ON_BOOT = os.getenv('TEMPLATE_WARMUP_ON_BOOT', 'True').lower() == 'true'
+TEMPLATE_WARMUP_DIRS = ('core', 'admin')
+
 WSGI_APPLICATION = 'blog_project.wsgi.application'
 
 
@@ -202,6 +208,121 @@ DATABASES = {
 }
 
 
+# Cache
+# A file-based cache is shared by every Passenger worker on the host, so
+# version stamps bumped by one worker are seen by all of them.
+# Once it holds MAX_ENTRIES files, every set deletes a random
+# 1/CULL_FREQUENCY of them, version stamps included. The page cache stores
+# one entry per URL, so size it well above the catalogue: a few entries per
+# post, category and tag plus the shared ones.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        'TIMEOUT': 60 * 60,
+        # Only the file and local-memory backends cull; memcached and redis
+        # would pass these on to their client
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+            'CULL_FREQUENCY': 10,
+        } if CACHE_BACKEND.endswith(('FileBasedCache', 'LocMemCache')) else {},
+    }
+}
+
+# Seconds a built sidebar block (trending / recent / popular tags) is kept
+# before it is rebuilt even without a content change.
+SIDEBAR_CACHE_TIMEOUT = 60 * 10
+
+# Homepage snapshot (core.homepage): the sections and the first
+# HOMEPAGE_SNAPSHOT_PAGES pages of the listing, rebuilt after content changes.
+HOMEPAGE_SNAPSHOT_PAGES = 3
+HOMEPAGE_SNAPSHOT_TIMEOUT = 60 * 60 * 6
+
+# Listings switch from numbered pages to keyset cursors after this page, and
+# cursor pages count at most PAGINATION_COUNT_LIMIT rows ("1000+ posts").
+PAGINATION_CURSOR_AFTER = 5
+PAGINATION_COUNT_LIMIT = 1000
+
+# Search-as-you-type: each worker indexes the titles of the newest
+# SUGGEST_MAX_POSTS published posts and answers with up to SUGGEST_LIMIT.
+SUGGEST_MAX_POSTS = 20000
+SUGGEST_LIMIT = 8
+
+# Search result cache (core.search): each worker keeps the ranked ids
+# (up to SEARCH_CACHE_RESULTS) of its SEARCH_CACHE_SIZE most used queries
+# and logs its hit rate every SEARCH_CACHE_LOG_INTERVAL seconds.
+SEARCH_CACHE_SIZE = 256
+SEARCH_CACHE_RESULTS = 150
+SEARCH_CACHE_LOG_INTERVAL = 60 * 10
+
+# Seconds an anonymous visitor's post, category, tag or page response is
+# kept (core.pagecache); entries are purged earlier when their content
+# changes. 0 disables the page cache.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Seconds a download link stays in the shared cache for the download
+# redirects (core.downloads); entries are dropped when the link is saved.
+DOWNLOAD_URL_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds the late-bound comment list fragments filled into cached pages
+# are kept (core.fragments); purged earlier on change.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Each worker keeps the active ads in memory (ads.registry) and checks the
+# shared 'ads' version for edits at most this often, in seconds.
+AD_REGISTRY_CHECK_INTERVAL = 5
+
+# The header, footer and sidebar are kept rendered in each worker's memory
+# ({% fragment_cache %}, core.fragments) until the site settings, ads or
+# posts change; at most TEMPLATE_FRAGMENT_CACHE_SIZE variants, each for at
+# most TEMPLATE_FRAGMENT_TIMEOUT seconds. 0 disables it.
+TEMPLATE_FRAGMENT_CACHE_SIZE = 500
+TEMPLATE_FRAGMENT_TIMEOUT = 60 * 60
+
+# Static pre-rendering (core.prerender): post, category and home pages are
+# written under PRERENDER_ROOT for the front web server. With
+# PRERENDER_ON_PUBLISH, saving a post re-renders the pages it appears on.
+PRERENDER_ROOT = os.getenv('PRERENDER_ROOT', str(BASE_DIR / 'prerendered'))
+PRERENDER_ON_PUBLISH = os.getenv('PRERENDER_ON_PUBLISH', 'False').lower() == 'true'
+PRERENDER_URL_SCHEME = 'https'
+# Every pre-rendered page shows the trending list: when a counter flush
+# changes it, they are all re-rendered, at most this often in seconds.
+PRERENDER_TRENDING_INTERVAL = 60 * 15
+# Seconds before the view beacon of a pre-rendered post counts another view
+# from the same client (core.views.count_post_view).
+POST_VIEW_BEACON_THROTTLE = 60 * 30
+
+# Anonymous post, category, tag and home pages served without touching the
+# session or CSRF cookie, as publicly cacheable responses
+# (core.middleware.SessionFreeAnonymousMiddleware).
+ANONYMOUS_PAGES_SESSION_FREE = os.getenv('ANONYMOUS_PAGES_SESSION_FREE', 'False').lower() == 'true'
+ANONYMOUS_CACHE_MAX_AGE = 60 * 5
+
+# Listing totals are cached per filter until posts change; totals from
+# PAGINATION_APPROXIMATE_AFTER up are shown rounded ("about 12,000 posts").
+PAGINATION_COUNT_TIMEOUT = 60 * 60 * 6
+PAGINATION_APPROXIMATE_AFTER = 10000
+
+# Buffered counters (core.counters): workers spool their in-memory counts to
+# this directory every COUNTER_SPOOL_INTERVAL seconds, and at most one worker
+# applies the spooled batches every COUNTER_FLUSH_INTERVAL seconds. Run
+# `manage.py flush_counters` from cron to flush on a fixed schedule as well.
+COUNTER_SPOOL_DIR = BASE_DIR / 'tmp' / 'counters'
+COUNTER_SPOOL_INTERVAL = 10
+COUNTER_FLUSH_INTERVAL = 60
+
+# View statistics (core.trending): hourly buckets are kept for
+# VIEW_STATS_HOURLY_DAYS and then rolled up into daily buckets, which are
+# kept for VIEW_STATS_RETENTION_DAYS. Compaction runs after a counter flush at
+# most every VIEW_STATS_COMPACT_INTERVAL seconds (or `manage.py compact_view_stats`).
+VIEW_STATS_HOURLY_DAYS = 2
+VIEW_STATS_RETENTION_DAYS = 30
+VIEW_STATS_COMPACT_INTERVAL = 60 * 60 * 6
+TRENDING_SIZE = 10
+TRENDING_TIMEOUT = 60 * 15
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -10,7 +10,8 @@ from core.sitemaps import PostSitemap, CategorySitemap, TagSitemap, StaticViewSi
 
 from django.contrib.sitemaps.views import sitemap as sitemap_view, index as sitemap_index_view
 
-from core.views import robots_txt, styled_sitemap, sitemap_stylesheet
+from core.pagecache import conditional_page
+from core.views import robots_txt, styled_sitemap, sitemap_stylesheet, sitemap_tags
 
 sitemaps = {
     'blog': PostSitemap, 
@@ -32,10 +33,11 @@ urlpatterns = [
     path('sitemap.xsl', sitemap_stylesheet, name='styled_sitemap_stylesheet'),
 
     # This path remains for search engines to crawl individual sitemaps
-    path('sitemap-<section>.xml', sitemap_view, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap-<section>.xml', conditional_page(sitemap_tags, global_tags=())(sitemap_view), {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     
-    path('', include('core.urls')), 
+    # Before core.urls, whose <category>/<slug>/ pattern would match ads/impressions/
     path('ads/', include('ads.urls')),
+    path('', include('core.urls')), 
     
 ] 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT, show_indexes=settings.DEBUG)
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_project.settings')
 
 application = get_wsgi_application()
+
+# Compile the templates before the first request reaches this worker
+from core.warmup import warm_on_boot
+
+warm_on_boot()
+
@@ -0,0 +1,45 @@
+# core/caching.py
+"""
+Version stamps kept in the shared cache.
+
+Instead of deleting cached entries one by one, every cache key is built from
+the current version of a namespace (e.g. 'sidebar'). Bumping the version makes
+all old keys unreachable at once; they simply expire on their own.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+
+
+def _new_stamp():
+    return time.time_ns()
+
+
+def get_version(namespace):
+    """Return the current version stamp for a namespace, creating it if needed."""
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        # add() so two workers racing here agree on a single stamp
+        cache.add(key, _new_stamp(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate everything cached under a namespace."""
+    version = _new_stamp()
+    cache.set(VERSION_KEY.format(namespace), version, None)
+    return version
+
+
+def versioned_key(namespace, *parts, version=None):
+    """
+    Build a cache key that changes whenever the namespace is bumped. Pass
+    the version when it has already been read.
+    """
+    if version is None:
+        version = get_version(namespace)
+    return ':'.join([namespace, str(version), *(str(part) for part in parts)])
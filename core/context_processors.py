@@ -1,86 +1,40 @@
 # core/context_processors.py
-from .models import Post, Category , SiteSettings # Import SiteSettings
-from taggit.models import Tag, TaggedItem # Import TaggedItem
-from django.db.models import Count, Q # Ensure Q is imported for filtering
-from django.utils import timezone
-from datetime import timedelta
+from .lazy import lazy_context_value
+from .models import SiteSettings
+from .sidebar import get_sidebar, get_trending, time_frame_or_default
+
 
 def global_sidebar_context(request):
     """
     Context processor to add trending, recent, and popular tags to all templates.
-    """
-    trending_posts = []
-    recent_posts = []
-    popular_tags = []
-
-    # Fetch Trending Posts
-    try:
-        trending_category = Category.objects.get(name='Trending')
-        trending_posts = Post.objects.filter(
-            is_published=True,
-            category=trending_category
-        ).order_by('-published_date')[:3]
-    except Category.DoesNotExist:
-        pass
-
-    # Fetch Recent Posts
-    recent_posts = Post.objects.filter(
-        is_published=True
-    ).order_by('-published_date')[:10]
 
-    # Corrected way to Fetch Popular Tags
-    # 1. Get the IDs of published posts.
-    published_post_ids = Post.objects.filter(is_published=True).values_list('id', flat=True)
-
-    # 2. Filter TaggedItem instances that relate to these published posts AND content type for Post.
-    # We need to explicitly specify the content_type, which requires importing ContentType
-    from django.contrib.contenttypes.models import ContentType
-    post_content_type = ContentType.objects.get_for_model(Post)
-
-    popular_tags = Tag.objects.filter(
-        taggit_taggeditem_items__object_id__in=published_post_ids, # TaggedItem's object_id is in published post IDs
-        taggit_taggeditem_items__content_type=post_content_type # And the content type matches Post
-    ).annotate(
-        num_times=Count('taggit_taggeditem_items')
-    ).order_by(
-        '-num_times'
-    )[:10]
-
-    return {
-        'trending_posts': trending_posts,
-        'recent_posts': recent_posts,
-        'popular_tags': popular_tags,
-    }
-    
-   
-
-def trending_posts_processor(request):
-    """
-    Context processor to add trending posts to the context of every request.
+    The block is served from the cache (see core.sidebar) and only rebuilt
+    when a post or tag changes. Nothing is fetched until a template reads
+    one of the values. The base template shows trending as a late fragment
+    (see core.fragments), which fetches it itself.
     """
-    time_frame = request.GET.get('time', '7days') # Get 'time' parameter from URL
-    
-    if time_frame == '24hrs':
-        time_threshold = timezone.now() - timedelta(hours=24)
-    else: # Default or '7days'
-        time_threshold = timezone.now() - timedelta(days=7)
+    time_frame = time_frame_or_default(request.GET.get('time')) # Get 'time' parameter from URL
 
-    trending_posts = Post.objects.filter(
-        is_published=True,
-        published_date__gte=time_threshold # Posts published within the timeframe
-    ).order_by('-views')[:10] # Order by views, limit to 5 (adjust as needed)
+    # One cache lookup shared by the two values below
+    sidebar = lazy_context_value(request, 'sidebar', get_sidebar)
 
     return {
-        'trending_posts': trending_posts,
+        'trending_posts': lazy_context_value(request, 'trending_posts', lambda: get_trending(time_frame)),
+        'recent_posts': lazy_context_value(request, 'recent_posts', lambda: sidebar['recent_posts']),
+        'popular_tags': lazy_context_value(request, 'popular_tags', lambda: sidebar['popular_tags']),
         'selected_time_frame': time_frame,
-    }    
+    }
 
-def site_settings(request):
+
+def _load_site_settings():
     try:
-        settings = SiteSettings.load()
+        return SiteSettings.load()
     except:
         # If there's an error, create default settings
-        settings = SiteSettings()
+        return SiteSettings()
+
+
+def site_settings(request):
     return {
-        'site_settings': settings
-    }
\ No newline at end of file
+        'site_settings': lazy_context_value(request, 'site_settings', _load_site_settings)
+    }
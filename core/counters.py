@@ -0,0 +1,261 @@
+# core/counters.py
+"""
+Buffered counters.
+
+Hits are summed in memory by each worker and every few seconds written out as
+a small, immutable batch file in a spool directory (one file per worker per
+interval, written to a temp name and renamed into place). A flush claims batch
+files by renaming them, which is atomic, so no batch is ever applied twice and
+no worker ever appends to a file that is being read. The summed totals are
+applied with one F() UPDATE per distinct increment, so hot rows are touched
+once per flush instead of once per request and concurrent flushes never lose
+updates.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+from .models import DownloadQuality, Post, Subtitle
+from .trending import compact_view_stats, hour_bucket, record_hourly_views, refresh_trending
+
+logger = logging.getLogger(__name__)
+
+BATCH_SUFFIX = '.batch'
+CLAIMED_SUFFIX = '.claimed'
+UPDATE_CHUNK_SIZE = 500
+
+# name -> counter, used by the flush_counters management command
+registry = {}
+
+
+class BufferedCounter:
+    """
+    Base class for a named counter. Subclasses implement apply(), which
+    receives a {key: amount} dict (keys are strings) inside a transaction.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._last_spool = time.monotonic()
+        registry[name] = self
+        atexit.register(self.spool)
+
+    @property
+    def spool_dir(self):
+        return Path(settings.COUNTER_SPOOL_DIR) / self.name
+
+    def incr(self, key, amount=1):
+        """Record a hit. Never touches the database on the request path."""
+        with self._lock:
+            self._pending[str(key)] += amount
+            due = time.monotonic() - self._last_spool >= settings.COUNTER_SPOOL_INTERVAL
+        if due:
+            self.spool()
+            self.maybe_flush()
+
+    def spool(self):
+        """Write this worker's pending counts to a new batch file."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_spool = time.monotonic()
+        if not pending:
+            return
+
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            name = f"{os.getpid()}-{uuid.uuid4().hex}"
+            tmp_path = self.spool_dir / f"{name}.tmp"
+            with open(tmp_path, 'w') as fh:
+                json.dump(pending, fh)
+            os.replace(tmp_path, self.spool_dir / f"{name}{BATCH_SUFFIX}")
+        except OSError as e:
+            logger.error(f"Could not spool {self.name} counts: {e}")
+            # Keep the counts for the next attempt
+            with self._lock:
+                self._pending.update(pending)
+
+    def maybe_flush(self):
+        """Flush at most once per COUNTER_FLUSH_INTERVAL across all workers."""
+        if cache.add(f"counter-flushed:{self.name}", 1, settings.COUNTER_FLUSH_INTERVAL):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Flushing {self.name} counts failed: {e}")
+
+    def _claim_batches(self):
+        claimed = []
+        if not self.spool_dir.is_dir():
+            return claimed
+        for path in sorted(self.spool_dir.glob(f"*{BATCH_SUFFIX}")):
+            target = path.with_suffix(CLAIMED_SUFFIX)
+            try:
+                os.rename(path, target)
+                os.utime(target)  # the claim time, for _abandoned_claims()
+            except FileNotFoundError:
+                continue  # another flusher got it first
+            claimed.append(target)
+        return self._abandoned_claims() + claimed
+
+    def _abandoned_claims(self):
+        """
+        Batches claimed by a flush that died before removing them. Only
+        called under the flush lock; claims older than a flush interval
+        cannot belong to a flush still running without the lock (Windows).
+        """
+        cutoff = time.time() - settings.COUNTER_FLUSH_INTERVAL
+        abandoned = []
+        for path in sorted(self.spool_dir.glob(f"*{CLAIMED_SUFFIX}")):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    abandoned.append(path)
+            except FileNotFoundError:
+                continue
+        if abandoned:
+            logger.warning(f"Recovering {len(abandoned)} abandoned {self.name} batch(es)")
+        return abandoned
+
+    def _flush_lock(self):
+        """Non-blocking exclusive lock so only one process flushes at a time."""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        fh = open(self.spool_dir / 'flush.lock', 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                fh.close()
+                return None
+        return fh
+
+    def flush(self):
+        """Apply every spooled batch to the database. Returns the total applied."""
+        self.spool()
+        lock = self._flush_lock()
+        if lock is None:
+            return 0
+
+        try:
+            claimed = self._claim_batches()
+            totals = Counter()
+            for path in claimed:
+                try:
+                    with open(path) as fh:
+                        totals.update(json.load(fh))
+                except ValueError:
+                    logger.error(f"Skipping unreadable {self.name} batch {path.name}")
+
+            try:
+                if totals:
+                    with transaction.atomic():
+                        self.apply(totals)
+            except Exception:
+                # Put the batches back so the next flush retries them
+                for path in claimed:
+                    os.rename(path, path.with_suffix(BATCH_SUFFIX))
+                raise
+
+            for path in claimed:
+                path.unlink()
+        finally:
+            lock.close()
+
+        if totals:
+            self.after_flush(totals)
+        return sum(totals.values())
+
+    def apply(self, totals):
+        raise NotImplementedError
+
+    def after_flush(self, totals):
+        """Hook run once the flushed totals are committed."""
+
+
+def add_to_field(model, field, totals):
+    """Add {pk: amount} to an integer field with one UPDATE per distinct amount."""
+    by_amount = defaultdict(list)
+    for pk, amount in totals.items():
+        by_amount[amount].append(int(pk))
+
+    for amount, pks in by_amount.items():
+        pks.sort()  # consistent lock order between concurrent flushes
+        for i in range(0, len(pks), UPDATE_CHUNK_SIZE):
+            model.objects.filter(pk__in=pks[i:i + UPDATE_CHUNK_SIZE]).update(
+                **{field: F(field) + amount}
+            )
+
+
+class ModelFieldCounter(BufferedCounter):
+    """Adds buffered counts (keyed by primary key) to an integer model field."""
+
+    def __init__(self, name, model, field):
+        super().__init__(name)
+        self.model = model
+        self.field = field
+
+    def apply(self, totals):
+        add_to_field(self.model, self.field, totals)
+
+
+class PostViewCounter(BufferedCounter):
+    """
+    Post views, keyed by post and hour. A flush adds the totals to Post.views
+    and to the hourly PostViewStat buckets, then refreshes the trending lists.
+    """
+
+    def incr(self, post_id, amount=1):
+        super().incr(f"{post_id}:{hour_bucket()}", amount)
+
+    def apply(self, totals):
+        per_hour = Counter()
+        for key, amount in totals.items():
+            post_id, _, hour = key.partition(':')
+            per_hour[(int(post_id), int(hour) if hour else hour_bucket())] += amount
+
+        # Posts deleted since the hit was recorded would break the inserts
+        live = set(Post.objects.filter(pk__in={post_id for post_id, _ in per_hour}).values_list('pk', flat=True))
+        per_hour = {key: amount for key, amount in per_hour.items() if key[0] in live}
+
+        per_post = Counter()
+        for (post_id, _), amount in per_hour.items():
+            per_post[post_id] += amount
+
+        add_to_field(Post, 'views', per_post)
+        record_hourly_views(per_hour)
+
+    def after_flush(self, totals):
+        from . import prerender
+        from .sidebar import invalidate_trending
+
+        if cache.add('view-stats-compacted', 1, settings.VIEW_STATS_COMPACT_INTERVAL):
+            compact_view_stats()
+        if refresh_trending():
+            invalidate_trending()
+            # Pre-rendered pages carry the list in their sidebar
+            if settings.PRERENDER_ON_PUBLISH and cache.add(
+                'prerender-trending', 1, settings.PRERENDER_TRENDING_INTERVAL
+            ):
+                prerender.refresh_all()
+
+
+post_views = PostViewCounter('post_views')
+
+# Download clicks (core.views.download_quality / download_subtitle)
+quality_downloads = ModelFieldCounter('quality_downloads', DownloadQuality, 'download_count')
+subtitle_downloads = ModelFieldCounter('subtitle_downloads', Subtitle, 'download_count')
@@ -0,0 +1,35 @@
+# core/downloads.py
+"""
+Download link lookups for the download redirects.
+
+The redirect views only need a quality's or subtitle's download_url, so the
+pk -> url map is kept in the shared cache: a redirect is a single cache get,
+and the database is only asked on a miss. The entries are deleted by the
+signal receivers in core.signals whenever a link is saved or deleted.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import DownloadQuality, Subtitle
+
+DOWNLOAD_MODELS = {
+    'quality': DownloadQuality,
+    'subtitle': Subtitle,
+}
+
+URL_KEY = 'download-url:{}:{}'
+
+
+def download_url(kind, pk):
+    """The download_url of a DownloadQuality ('quality') or Subtitle ('subtitle'), or None."""
+    key = URL_KEY.format(kind, pk)
+    url = cache.get(key)
+    if url is None:
+        url = DOWNLOAD_MODELS[kind].objects.filter(pk=pk).values_list('download_url', flat=True).first()
+        if url is not None:
+            cache.set(key, url, settings.DOWNLOAD_URL_CACHE_TIMEOUT)
+    return url
+
+
+def forget(kind, pk):
+    cache.delete(URL_KEY.format(kind, pk))
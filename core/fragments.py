@@ -0,0 +1,210 @@
+# core/fragments.py
+"""
+Late-bound page fragments.
+
+The ad slots, a post's comment list and the sidebar's trending list change
+independently of the page around them. When a page is rendered for the full-page cache (see
+core.pagecache), the {% late_fragment %} tag leaves a marker in their place
+instead, so the cached page is a long-lived shell. Every response built from
+the shell has its markers filled from the fragments' own cache entries, so
+editing an ad or approving a comment no longer makes cached pages stale.
+
+Ad slots are filled from the in-memory ad registry (ads.registry), which
+picks one of the slot's ads per response, so rotation and frequency caps
+also apply to pages served from the cache (pre-rendered files leave the
+slots to the page script); a post's
+comments are cached under their own 'comments:<post id>' version stamp,
+bumped by the signal receivers in core.signals, and the trending list under
+the 'trending' stamp, bumped when a counter flush changes the ranking.
+
+The header, footer and sidebar are cached differently: their rendered HTML
+is kept in each worker's memory by the {% fragment_cache %} tag, keyed on
+the stamps of the site settings, the active ads and the latest post change
+(see TemplateFragmentCache). They render once per content change per worker
+instead of on every response.
+"""
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from ads.registry import ADS_NAMESPACE, registry as ad_registry
+from ads.rotation import seen_counts
+from ads.tracking import slot_html
+
+from .caching import VERSION_KEY, get_version, versioned_key
+from .models import Comment
+from .sidebar import TRENDING_NAMESPACE, get_trending, time_frame_or_default
+
+LATE_ATTR = 'late_fragments'
+# {tag: version} of the fragments filled into a response, for its validators
+VERSIONS_ATTR = 'fragment_versions'
+# Set when a response shows a rotating or frequency-capped ad slot
+VARIES_ATTR = 'varying_fragments'
+
+CLIENT_AD_SLOT = '<div class="ad-slot" data-ad-fill="{slot}"></div>'
+
+MARKER = '<!--late-fragment:{kind}:{arg}-->'
+MARKER_RE = re.compile(rb'<!--late-fragment:(\w+):([\w-]+)-->')
+
+ADS_TAG = ADS_NAMESPACE
+
+
+def comments_tag(post_id):
+    return f'comments:{post_id}'
+
+
+def _record(request, tag, version):
+    versions = getattr(request, VERSIONS_ATTR, None)
+    if versions is None:
+        versions = {}
+        setattr(request, VERSIONS_ATTR, versions)
+    versions[tag] = version
+    return version
+
+
+def ads_version():
+    """The 'ads' stamp of the ads this worker shows (no cache round trip)."""
+    ad_registry.refresh()
+    return ad_registry.version
+
+
+def ads_vary():
+    """Whether some ad slot shows a different ad from response to response."""
+    return ad_registry.any_varies()
+
+
+def render_ad(request, slot):
+    if getattr(request, 'prerendering', False):
+        # Static files outlive ad edits and cannot rotate: the page script
+        # fills the slot in (see ads.views.ad_slots)
+        return CLIENT_AD_SLOT.format(slot=slot)
+    _record(request, ADS_TAG, ads_version())
+    rotation = ad_registry.rotation(slot)
+    if rotation is None:
+        return ''
+    if rotation.varies:
+        setattr(request, VARIES_ATTR, True)
+    ad = rotation.choose(seen_counts(request))
+    return slot_html(ad, slot) if ad else ''
+
+
+def render_comments(request, post_id):
+    tag = comments_tag(post_id)
+    key = versioned_key(tag, 'html', version=_record(request, tag, get_version(tag)))
+    html = cache.get(key)
+    if html is None:
+        comments = list(Comment.objects.filter(post_id=post_id, is_approved=True).order_by('-created_at'))
+        html = render_to_string('core/includes/comments.html', {'comments': comments})
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    return html
+
+
+# Not recorded: the ranking moves with every counter flush, and a revalidated
+# page showing a slightly older one is fine
+def render_trending(request, time_frame):
+    time_frame = time_frame_or_default(time_frame)
+    key = versioned_key(TRENDING_NAMESPACE, 'html', time_frame)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('core/includes/trending.html', {
+            'trending_posts': get_trending(time_frame),
+            'selected_time_frame': time_frame,
+        })
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    return html
+
+
+FRAGMENTS = {
+    'ad': render_ad,
+    'comments': render_comments,
+    'trending': render_trending,
+}
+
+
+def render_fragment(request, kind, arg):
+    """
+    Render a fragment in place, or only its marker while the page is being
+    rendered as a cache shell.
+    """
+    if getattr(request, LATE_ATTR, False):
+        return MARKER.format(kind=kind, arg=arg)
+    return FRAGMENTS[kind](request, str(arg))
+
+
+def fill(content, request):
+    """Replace the fragment markers in a rendered page (bytes) for this request."""
+    if b'<!--late-fragment:' not in content:
+        return content
+    rendered = {}
+
+    def replace(match):
+        marker = match.group(0)
+        kind = match.group(1).decode()
+        if kind not in FRAGMENTS:
+            return marker
+        if marker not in rendered:
+            rendered[marker] = FRAGMENTS[kind](request, match.group(2).decode()).encode()
+        return rendered[marker]
+
+    return MARKER_RE.sub(replace, content)
+
+
+# Bumped on SiteSettings saves, Ad changes and Post/Tag changes (core.signals)
+TEMPLATE_FRAGMENT_TAGS = ('site', ADS_TAG, 'sidebar')
+VERSION_ATTR = 'template_fragment_version'
+
+
+def template_fragment_version(request=None):
+    """The current stamps of TEMPLATE_FRAGMENT_TAGS, read once per request."""
+    version = getattr(request, VERSION_ATTR, None)
+    if version is None:
+        keys = [VERSION_KEY.format(tag) for tag in TEMPLATE_FRAGMENT_TAGS]
+        stamps = cache.get_many(keys)
+        version = tuple(stamps.get(key) or get_version(tag) for key, tag in zip(keys, TEMPLATE_FRAGMENT_TAGS))
+        if request is not None:
+            setattr(request, VERSION_ATTR, version)
+    return version
+
+
+class TemplateFragmentCache:
+    """
+    Rendered template fragments of one worker, keyed on (fragment name,
+    vary-on values). Emptied whenever the version moves; entries also expire
+    after TEMPLATE_FRAGMENT_TIMEOUT, and the oldest is dropped when full.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = {}
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get_or_render(self, key, version, render):
+        if not self.maxsize:
+            return render()
+        now = time.monotonic()
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            entry = self.entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        html = render()
+        with self.lock:
+            if version == self.version:
+                if key not in self.entries and len(self.entries) >= self.maxsize:
+                    del self.entries[next(iter(self.entries))]
+                self.entries[key] = (html, now + self.timeout)
+        return html
+
+
+template_fragments = TemplateFragmentCache(
+    settings.TEMPLATE_FRAGMENT_CACHE_SIZE, settings.TEMPLATE_FRAGMENT_TIMEOUT
+)
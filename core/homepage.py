@@ -0,0 +1,126 @@
+# core/homepage.py
+"""
+Homepage data: the admin-configured sections and the "other posts" listing.
+
+Almost every visitor sees the same sections and the same first pages of the
+listing, so both are materialized into a snapshot kept in the cache. The
+snapshot is keyed on a version stamp that is bumped whenever a Post,
+HomepageSection or Category changes (see core.signals), and rebuilt on the
+next request. Searches and pages past HOMEPAGE_SNAPSHOT_PAGES are served by
+live queries.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils.functional import cached_property
+
+from .caching import bump_version, versioned_key
+from .models import HomepageSection, Post
+
+HOMEPAGE_NAMESPACE = 'homepage'
+
+# Sections and the "other posts" listing float posts updated after publishing
+# to the top (Post.updated_priority); covered by the post_home_order_idx index
+HOME_ORDERING = ('-updated_priority', '-published_date', '-updated_date', '-id')
+SECTION_SIZE = 6
+HOME_PAGE_SIZE = 15
+
+
+def get_section_data(sections):
+    """
+    Fetch the top SECTION_SIZE posts of every section in one query.
+
+    A post belongs to a section through its category, so the query joins
+    Post -> Category -> HomepageSection and numbers the rows per section with
+    a window function; only the first SECTION_SIZE rows of each are kept.
+    """
+    section_posts = Post.objects.cards().filter(
+        is_published=True,
+        category__homepagesection__in=sections,
+    ).annotate(
+        section_id=F('category__homepagesection'),
+    ).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('category__homepagesection'),
+            order_by=[F(field[1:]).desc() for field in HOME_ORDERING],
+        )
+    ).filter(
+        row_number__lte=SECTION_SIZE
+    ).order_by('section_id', 'row_number')
+
+    posts_by_section = defaultdict(list)
+    for post in section_posts:
+        posts_by_section[post.section_id].append(post)
+
+    return [
+        {
+            'title': section.title,
+            'posts': posts_by_section[section.id],
+            'id': section.id
+        }
+        for section in sections
+    ]
+
+
+def get_other_posts(section_category_ids):
+    """Published posts outside the section categories, in homepage order."""
+    return Post.objects.cards().filter(
+        is_published=True
+    ).exclude(
+        category__in=section_category_ids
+    ).order_by(*HOME_ORDERING)
+
+
+def build_homepage_snapshot():
+    # Section -> category mappings are fetched once and reused below
+    sections = list(HomepageSection.objects.filter(enabled=True).prefetch_related('categories'))
+    section_category_ids = sorted({cat.id for section in sections for cat in section.categories.all()})
+
+    other_posts = get_other_posts(section_category_ids)
+    size = HOME_PAGE_SIZE * settings.HOMEPAGE_SNAPSHOT_PAGES
+
+    return {
+        'sections': get_section_data(sections),
+        'section_category_ids': section_category_ids,
+        'posts': list(other_posts[:size]),
+        'count': other_posts.count(),
+    }
+
+
+def get_homepage_snapshot():
+    key = versioned_key(HOMEPAGE_NAMESPACE, 'snapshot')
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_homepage_snapshot()
+        cache.set(key, snapshot, settings.HOMEPAGE_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def invalidate_homepage():
+    bump_version(HOMEPAGE_NAMESPACE)
+
+
+def snapshot_page(page_number):
+    """Return the page number if the snapshot covers it, else None."""
+    try:
+        number = int(page_number)
+    except (TypeError, ValueError):
+        return 1  # the view falls back to page 1 for junk input
+    return number if 1 <= number <= settings.HOMEPAGE_SNAPSHOT_PAGES else None
+
+
+class SnapshotPaginator(Paginator):
+    """Paginates the snapshot's first pages while reporting the full count."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count
@@ -0,0 +1,28 @@
+# core/lazy.py
+"""
+Lazy context values.
+
+Context processors run for every template render, including pages that never
+show the sidebar or the ads. Wrapping their values in lazy_context_value()
+defers the work until a template actually reads the variable, and then
+memoizes it for the rest of the render.
+"""
+from django.utils.functional import SimpleLazyObject
+
+MATERIALIZED_ATTR = 'lazy_context_materialized'
+
+
+def lazy_context_value(request, name, func):
+    """
+    Return a proxy that calls func() on first access.
+
+    The name of every value that gets materialized is recorded on the request
+    (see core.middleware.LazyContextMiddleware) so the saving can be checked.
+    """
+    def materialize():
+        materialized = getattr(request, MATERIALIZED_ATTR, None)
+        if materialized is not None:
+            materialized.append(name)
+        return func()
+
+    return SimpleLazyObject(materialize)
@@ -0,0 +1,19 @@
+# core/management/commands/compact_view_stats.py
+from django.core.management.base import BaseCommand
+
+from core.sidebar import invalidate_trending
+from core.trending import compact_view_stats, refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Rolls hourly post view stats up into daily buckets, drops expired stats and refreshes the trending lists.'
+
+    def handle(self, *args, **options):
+        rolled_up, expired = compact_view_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {rolled_up} hourly row(s), removed {expired} expired row(s)."
+        ))
+
+        if refresh_trending():
+            invalidate_trending()
+        self.stdout.write(self.style.SUCCESS("Trending lists refreshed."))
@@ -0,0 +1,24 @@
+# core/management/commands/flush_counters.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core.counters import registry
+
+
+class Command(BaseCommand):
+    help = 'Applies spooled counter batches (post views, ...) to the database. Safe to run from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help=f"Counters to flush (default: all). Available: {', '.join(sorted(registry))}"
+        )
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(registry)
+        unknown = [name for name in names if name not in registry]
+        if unknown:
+            raise CommandError(f"Unknown counter(s): {', '.join(unknown)}")
+
+        for name in names:
+            applied = registry[name].flush()
+            self.stdout.write(self.style.SUCCESS(f"{name}: applied {applied} hit(s)."))
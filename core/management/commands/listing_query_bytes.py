@@ -0,0 +1,69 @@
+# core/management/commands/listing_query_bytes.py
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count, Q
+from taggit.models import Tag
+
+from core.models import Category, Post
+from core.search import search_posts
+
+
+def result_bytes(queryset):
+    """
+    Rows and approximate bytes of a queryset's result set. MySQL's text
+    protocol sends every value in its text form, so that is what is measured.
+    """
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    size = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            if isinstance(value, (bytes, memoryview)):
+                size += len(value)
+            else:
+                size += len(str(value).encode())
+    return len(rows), size
+
+
+class Command(BaseCommand):
+    help = ('Compares the bytes the post listings fetch per page with full Post rows '
+            '(before) and with the card projection, Post.objects.cards() (after).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-page', type=int, default=15)
+        parser.add_argument('--category', help='Category slug (default: the largest category).')
+        parser.add_argument('--tag', help='Tag slug (default: the first tag).')
+        parser.add_argument('--query', default='movie', help='Search query (default: "movie").')
+
+    def handle(self, *args, **options):
+        per_page = options['per_page']
+        category = options['category'] or Category.objects.annotate(
+            posts=Count('post', filter=Q(post__is_published=True))
+        ).order_by('-posts').values_list('slug', flat=True).first()
+        tag = options['tag'] or Tag.objects.values_list('slug', flat=True).first()
+
+        listings = {
+            'home': lambda posts: posts.filter(is_published=True).order_by('-published_date', '-id'),
+            f'category {category}': lambda posts: posts.filter(
+                category__slug=category, is_published=True
+            ).order_by('-published_date', '-id'),
+            f'tag {tag}': lambda posts: posts.filter(tags__slug=tag, is_published=True).order_by('-published_date', '-id'),
+            f'search "{options["query"]}"': lambda posts: search_posts(options['query'], posts.filter(is_published=True)),
+        }
+
+        total_before = total_after = 0
+        for name, listing in listings.items():
+            rows, before = result_bytes(listing(Post.objects.select_related('category'))[:per_page])
+            _, after = result_bytes(listing(Post.objects.cards())[:per_page])
+            total_before += before
+            total_after += after
+            saved = 100 - after * 100 // before if before else 0
+            self.stdout.write(f"{name}: {rows} rows, {before:,} -> {after:,} bytes ({saved}% less)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Per page across listings: {total_before:,} -> {total_after:,} bytes."
+        ))
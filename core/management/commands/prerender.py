@@ -0,0 +1,37 @@
+# core/management/commands/prerender.py
+from django.core.management.base import BaseCommand
+
+from core.models import Category, Post
+from core.prerender import prerender, prerender_home, prerender_post
+
+
+class Command(BaseCommand):
+    help = 'Pre-renders the homepage, category pages and post pages to static files under PRERENDER_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--post', type=int, action='append', default=[], dest='post_ids',
+                            help='Post id to pre-render (repeatable).')
+        parser.add_argument('--recent', type=int, default=20,
+                            help='Also pre-render the newest N published posts (default 20).')
+        parser.add_argument('--all', action='store_true',
+                            help='Pre-render every published post.')
+
+    def handle(self, *args, **options):
+        prerender_home()
+        categories = Category.objects.all()
+        for category in categories:
+            prerender(category.get_absolute_url())
+        self.stdout.write(f"Rendered the homepage and {categories.count()} category page(s).")
+
+        posts = Post.objects.filter(is_published=True, category__isnull=False).select_related('category')
+        if options['all']:
+            selected = posts.order_by('-published_date')
+        else:
+            recent = posts.order_by('-published_date')[:options['recent']]
+            selected = posts.filter(pk__in=[*options['post_ids'], *recent.values_list('pk', flat=True)])
+
+        count = 0
+        for post in selected.iterator(chunk_size=200):
+            prerender_post(post)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rendered {count} post page(s)."))
@@ -0,0 +1,12 @@
+# core/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index from every published post.'
+
+    def handle(self, *args, **options):
+        posts, rows = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {posts} post(s) into {rows} search term row(s)."))
@@ -0,0 +1,19 @@
+# core/management/commands/warm_templates.py
+from django.core.management.base import BaseCommand
+
+from core.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = 'Compiles the project templates (as worker boot does) and reports the parse time of each.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('subdirs', nargs='*',
+                            help='Template subdirectories to compile (default: TEMPLATE_WARMUP_DIRS).')
+
+    def handle(self, *args, **options):
+        timings = warm_templates(options['subdirs'] or None)
+        for name, seconds in sorted(timings, key=lambda t: -t[1]):
+            self.stdout.write(f"{seconds * 1000:8.2f} ms  {name}")
+        total = sum(seconds for _, seconds in timings)
+        self.stdout.write(self.style.SUCCESS(f"Compiled {len(timings)} template(s) in {total * 1000:.1f} ms."))
@@ -0,0 +1,91 @@
+# core/middleware.py
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils.cache import patch_cache_control
+
+from .fragments import VARIES_ATTR
+from .lazy import MATERIALIZED_ATTR
+
+logger = logging.getLogger(__name__)
+
+
+class LazyContextMiddleware:
+    """
+    Records which lazy context values (see core.lazy) were materialized while
+    handling a request. The list is logged at DEBUG level and, when DEBUG is
+    on, returned in an X-Lazy-Context response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        setattr(request, MATERIALIZED_ATTR, [])
+        response = self.get_response(request)
+
+        materialized = getattr(request, MATERIALIZED_ATTR)
+        logger.debug(
+            "%s materialized %d lazy context value(s): %s",
+            request.path, len(materialized), ', '.join(materialized) or '-'
+        )
+        if settings.DEBUG:
+            response['X-Lazy-Context'] = ','.join(materialized) or '-'
+        return response
+
+
+def session_free(view):
+    """Mark a function view as servable session-free (see SessionFreeAnonymousMiddleware)."""
+    view.session_free = True
+    return view
+
+
+class SessionFreeAnonymousMiddleware:
+    """
+    With ANONYMOUS_PAGES_SESSION_FREE on, anonymous GETs of views marked
+    session_free (a function attribute, or a class attribute on class-based
+    views) never touch the session or the CSRF cookie: request.user is set
+    to AnonymousUser without reading the session, the comment form renders
+    without a token (it fetches one when used), and the response is marked
+    publicly cacheable for ANONYMOUS_CACHE_MAX_AGE seconds (unless it shows
+    a rotating or frequency-capped ad).
+
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.session_free = False
+        response = self.get_response(request)
+        if request.session_free and self._is_shareable(request, response):
+            patch_cache_control(response, public=True, max_age=settings.ANONYMOUS_CACHE_MAX_AGE)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        marked = getattr(view_func, 'session_free', False) or getattr(view_class, 'session_free', False)
+        if (
+            settings.ANONYMOUS_PAGES_SESSION_FREE
+            and marked
+            and request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        ):
+            # No session cookie means no logged-in user; skip the session lookup
+            request.user = AnonymousUser()
+            request.session_free = True
+
+    @staticmethod
+    def _is_shareable(request, response):
+        return (
+            response.status_code == 200
+            # Rotating or capped ads are picked per response (see ads.rotation)
+            and not getattr(request, VARIES_ATTR, False)
+            and not response.cookies
+            and not response.has_header('Cache-Control')
+            and not request.session.accessed
+            # A token was handed out, so CsrfViewMiddleware is about to set a cookie
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_category_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostViewStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], default='hour', max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day (UTC)')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_stats', to='core.post')),
+            ],
+            options={
+                'verbose_name': 'Post View Stat',
+                'verbose_name_plural': 'Post View Stats',
+                'indexes': [models.Index(fields=['period', 'bucket'], name='core_postvi_period_400e82_idx')],
+                'unique_together': {('post', 'period', 'bucket')},
+            },
+        ),
+    ]
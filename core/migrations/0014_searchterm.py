@@ -0,0 +1,28 @@
+# Generated by Django 4.2.13 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_postviewstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='core.post')),
+            ],
+            options={
+                'verbose_name': 'Search Term',
+                'verbose_name_plural': 'Search Terms',
+                'unique_together': {('term', 'post')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.13 on 2026-10-18 21:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_category_slugs(apps, schema_editor):
+    Category = apps.get_model('core', 'Category')
+    Post = apps.get_model('core', 'Post')
+    slug = Category.objects.filter(pk=OuterRef('category_id')).values('slug')[:1]
+    Post.objects.update(category_slug=Coalesce(Subquery(slug), Value('')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_searchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='category_slug',
+            field=models.SlugField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(copy_category_slugs, migrations.RunPython.noop),
+    ]
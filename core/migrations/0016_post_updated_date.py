@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2026-10-18 17:10
+
+from django.db import migrations, models
+import taggit.managers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('core', '0015_post_category_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='download_section_title',
+            field=models.CharField(blank=True, default='Download Below', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='tags',
+            field=taggit.managers.TaggableManager(blank=True, help_text='A comma-separated list of tags.', through='taggit.TaggedItem', to='taggit.Tag', verbose_name='Tags'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.13 on 2026-10-18 17:12
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_priority(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    Post.objects.filter(updated_date__gt=F('published_date')).update(updated_priority=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_post_updated_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated_priority',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_updated_priority, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_published', '-updated_priority', '-published_date', '-updated_date', '-id'], name='post_home_order_idx'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 # your_app/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from taggit.managers import TaggableManager
 from taggit.models import Tag as TaggitTag
@@ -55,6 +55,36 @@ class Category(models.Model):
         # that takes the category's slug as an argument.
         return reverse('category', kwargs={'slug': self.slug})
 
+    def save(self, *args, **kwargs):
+        old_slug = Category.objects.filter(pk=self.pk).values_list('slug', flat=True).first() if self.pk else None
+        super().save(*args, **kwargs)
+        # Keep the slug copied onto posts (Post.category_slug) in step
+        Post.objects.filter(category=self).exclude(category_slug=self.slug).update(category_slug=self.slug)
+        if old_slug and old_slug != self.slug:
+            self.slug_changed(old_slug)
+
+    def slug_changed(self, old_slug):
+        """
+        Refresh what was built from the old post URLs. The bulk update above
+        sends no post_save, so the receivers in core.signals never see it.
+        """
+        from . import prerender
+        from .homepage import invalidate_homepage
+        from .pagecache import SITEMAP_TAG, purge
+        from .sidebar import invalidate_sidebar
+        from .suggest import invalidate_suggestions
+
+        def refresh():
+            # The sidebar stamp is part of every cached page's validators
+            invalidate_sidebar()
+            invalidate_homepage()
+            invalidate_suggestions()
+            purge(SITEMAP_TAG)
+            if settings.PRERENDER_ON_PUBLISH:
+                prerender.category_renamed(self, old_slug)
+
+        transaction.on_commit(refresh)
+
 
 from django.contrib.auth import get_user_model
 import logging
@@ -63,6 +93,19 @@ from urllib.parse import urlparse
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+class PostQuerySet(models.QuerySet):
+    # What a listing card shows, plus the home ordering's columns for its
+    # cursors (core.pagination): everything but the post body and download settings
+    CARD_FIELDS = (
+        'title', 'slug', 'seo_title', 'thumbnail', 'excerpt', 'published_date',
+        'updated_date', 'updated_priority', 'category_slug', 'category__name', 'category__slug',
+    )
+
+    def cards(self):
+        """Posts for listings, without the large content column."""
+        return self.select_related('category').only(*self.CARD_FIELDS)
+
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
@@ -114,11 +157,27 @@ class Post(models.Model):
 
     author = models.ForeignKey(User, on_delete=models.CASCADE, default=2)
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True)
+    # Copy of category.slug so get_absolute_url() needs no query; kept in
+    # step by Post.save() and Category.save()
+    category_slug = models.SlugField(max_length=100, blank=True, editable=False)
     tags = TaggableManager(blank=True)
     published_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
+    # 1 once the post was updated after publishing: the homepage floats these
+    # to the top (core.homepage). Stored, so listings keyset on indexed columns.
+    updated_priority = models.PositiveSmallIntegerField(default=0, editable=False)
     is_published = models.BooleanField(default=True)
 
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['is_published', '-updated_priority', '-published_date', '-updated_date', '-id'],
+                name='post_home_order_idx',
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         from .utils import shorten_url
         from urllib.parse import urlparse
@@ -130,6 +189,11 @@ class Post(models.Model):
             from django.utils.text import slugify
             self.slug = slugify(self.title)
 
+        self.category_slug = self.category.slug if self.category_id else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'category' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'category_slug'}
+
         def is_shortened(url):
             try:
                 return urlparse(url).netloc.endswith(SHORT_DOMAIN)
@@ -146,9 +210,15 @@ class Post(models.Model):
 
         super().save(*args, **kwargs)
 
+        # The dates are only final once saved (auto_now / auto_now_add)
+        updated_priority = int(self.updated_date > self.published_date)
+        if updated_priority != self.updated_priority:
+            self.updated_priority = updated_priority
+            Post.objects.filter(pk=self.pk).update(updated_priority=updated_priority)
+
     def get_absolute_url(self):
         return reverse('post_detail', kwargs={
-            'category': self.category.slug,
+            'category': self.category_slug if self.category_id and self.category_slug else self.category.slug,
             'slug': self.slug
         })
 
@@ -160,6 +230,54 @@ class Post(models.Model):
         return self.seo_title if self.seo_title else self.title
 
 
+class PostViewStat(models.Model):
+    """
+    Views of a post within one time bucket. Rows are written in batches by the
+    view counter (core.counters); hourly rows are rolled up into daily rows
+    and old rows are dropped by core.trending.compact_view_stats().
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = [
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='view_stats')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES, default=HOUR)
+    bucket = models.DateTimeField(help_text="Start of the hour or day (UTC)")
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'period', 'bucket')
+        indexes = [
+            models.Index(fields=['period', 'bucket']),
+        ]
+        verbose_name = "Post View Stat"
+        verbose_name_plural = "Post View Stats"
+
+    def __str__(self):
+        return f"{self.post_id} {self.period} {self.bucket:%Y-%m-%d %H:00}: {self.views}"
+
+
+class SearchTerm(models.Model):
+    """
+    One row of the search index: a normalized term appearing in a published
+    post, with its field-weighted relevance. Maintained by core.search.
+    """
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('term', 'post')
+        verbose_name = "Search Term"
+        verbose_name_plural = "Search Terms"
+
+    def __str__(self):
+        return f"{self.term} -> {self.post_id} ({self.weight})"
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     name = models.CharField(max_length=100)
@@ -0,0 +1,291 @@
+# core/pagecache.py
+"""
+Full-page cache for anonymous visitors.
+
+Post, category, tag and static pages look the same to every anonymous
+visitor, so their rendered responses are stored in the shared cache. Each
+entry is tagged with what it was built from (e.g. 'post:12', 'category:3',
+plus the sidebar, ads and site settings every page shows) and remembers the
+version of each tag at render time. The signal receivers in core.signals
+purge a tag by bumping its version, which makes exactly the entries built
+from it stale. Checking an entry is a single get_many() of its tag versions,
+so a hit runs no database queries.
+
+Ad slots, comment lists and the trending list are left in the stored page
+as markers and filled in for every response (see core.fragments), so an ad
+edit, a new comment or a trending refresh does not make cached pages stale.
+
+The comment form's CSRF token is stored as a placeholder and filled in with
+the visitor's own token when the page is served (left empty for session-free
+requests, see core.middleware.SessionFreeAnonymousMiddleware).
+
+The same tag versions double as HTTP validators (see conditional_page()):
+the ETag is a digest of the versions and Last-Modified is the newest of
+them (the stamps are timestamps), so a revalidating client gets a 304
+without the page being rendered or looked up.
+"""
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import fragments
+from .caching import VERSION_KEY, bump_version, get_version
+
+TAGS_ATTR = 'page_cache_tags'
+
+# Shown on every page through the base template and context processors
+GLOBAL_TAGS = ('sidebar', 'ads', 'site')
+# ...less the ads, which stored pages only hold as fragment markers
+SHELL_TAGS = ('sidebar', 'site')
+
+CSRF_PLACEHOLDER = b'__page_cache_csrf_token__'
+# Empty token inputs (session-free pages) are left alone
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")([^"]+)(")')
+
+
+def post_tag(pk):
+    return f'post:{pk}'
+
+
+def category_tag(pk):
+    return f'category:{pk}'
+
+
+def tag_tag(pk):
+    return f'tag:{pk}'
+
+
+def page_tag(pk):
+    return f'page:{pk}'
+
+
+# Bumped by post, category, tag and page changes (core.signals)
+SITEMAP_TAG = 'sitemap'
+
+
+def tag_page(request, *tags):
+    """
+    Record what the page being rendered depends on. Call it as soon as the
+    objects are known, before the rest of the page is queried, so an edit
+    made mid-render leaves the entry stale rather than wrongly fresh.
+    """
+    versions = getattr(request, TAGS_ATTR, None)
+    if versions is not None:
+        for tag in tags:
+            versions[tag] = get_version(tag)
+
+
+def purge(*tags):
+    """Make every cached page built from any of the tags stale."""
+    for tag in tags:
+        bump_version(tag)
+
+
+def _cache_key(request):
+    url = request.build_absolute_uri()  # OG tags embed absolute URLs
+    return 'pagecache:' + hashlib.md5(url.encode()).hexdigest()
+
+
+def _is_cacheable_request(request):
+    return (
+        settings.PAGE_CACHE_TIMEOUT
+        and request.method in ('GET', 'HEAD')
+        # Logged-in users, and anyone else with a session, get fresh pages
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def _is_fresh(entry):
+    versions = entry['versions']
+    current = cache.get_many([VERSION_KEY.format(tag) for tag in versions])
+    return all(current.get(VERSION_KEY.format(tag)) == version for tag, version in versions.items())
+
+
+def _strip_csrf_token(content):
+    """
+    Replace rendered CSRF tokens with the placeholder. Returns None when a
+    token also appears somewhere it cannot be swapped out safely.
+    """
+    tokens = {match.group(2) for match in CSRF_INPUT_RE.finditer(content)}
+    if not tokens:
+        return content
+    content = CSRF_INPUT_RE.sub(rb'\1' + CSRF_PLACEHOLDER + rb'\3', content)
+    if any(token in content for token in tokens):
+        return None
+    return content
+
+
+def _store(request, response, versions):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    if 'private' in response.get('Cache-Control', '') or response.has_header('Vary'):
+        return
+    content = _strip_csrf_token(response.content)
+    if content is None:
+        return
+    entry = {
+        'content': content,
+        'headers': {name: value for name, value in response.items() if name.lower() != 'content-length'},
+        'versions': versions,
+    }
+    cache.set(_cache_key(request), entry, settings.PAGE_CACHE_TIMEOUT)
+
+
+def _serve(request, entry):
+    content = fragments.fill(entry['content'], request)
+    if CSRF_PLACEHOLDER in content:
+        # Session-free requests leave the token to the form's own fetch
+        token = b'' if getattr(request, 'session_free', False) else get_token(request).encode()
+        content = content.replace(CSRF_PLACEHOLDER, token)
+    response = HttpResponse(content, headers=entry['headers'])
+    if settings.DEBUG:
+        response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def anonymous_page_cache(on_hit=None):
+    """
+    Cache a view's responses for anonymous GET requests. The view tags its
+    page with tag_page(); on_hit(request, tags) runs for every cache hit
+    (e.g. to count a post view the view itself would have counted).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+
+            key = _cache_key(request)
+            entry = cache.get(key)
+            if entry is not None and _is_fresh(entry):
+                if on_hit is not None:
+                    on_hit(request, entry['versions'])
+                setattr(request, TAGS_ATTR, dict(entry['versions']))  # for conditional_page()
+                return _serve(request, entry)
+
+            versions = {tag: get_version(tag) for tag in SHELL_TAGS}
+            setattr(request, TAGS_ATTR, versions)
+            setattr(request, fragments.LATE_ATTR, True)
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            if response.streaming:
+                return response
+            if request.method == 'GET' and len(versions) > len(SHELL_TAGS):
+                _store(request, response, versions)
+            response.content = fragments.fill(response.content, request)
+            return response
+        return wrapped
+    return decorator
+
+
+def _is_conditional(request):
+    return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+
+def _current_versions(tags):
+    """The current versions of the tags, in one get_many()."""
+    keys = {tag: VERSION_KEY.format(tag) for tag in tags if tag != fragments.ADS_TAG}
+    stored = cache.get_many(list(keys.values()))
+    versions = {tag: stored.get(key) or get_version(tag) for tag, key in keys.items()}
+    if fragments.ADS_TAG in tags:
+        # What this worker's ad slots are filled from (see core.fragments)
+        versions[fragments.ADS_TAG] = fragments.ads_version()
+    return versions
+
+
+def _rendered_versions(request):
+    """
+    The versions a page-cached response was built from: its stored shell's
+    tags plus those of the fragments filled into it. None when the view did
+    not go through anonymous_page_cache or did not tag its page.
+    """
+    versions = getattr(request, TAGS_ATTR, None)
+    if versions is None or len(versions) <= len(SHELL_TAGS):
+        return None
+    return {**versions, **getattr(request, fragments.VERSIONS_ATTR, {})}
+
+
+def _validators(request, versions):
+    # Logged-in visitors see extra controls, so they get their own validator
+    audience = 'session' if settings.SESSION_COOKIE_NAME in request.COOKIES else 'anonymous'
+    digest = hashlib.md5(repr((audience, sorted(versions.items()))).encode()).hexdigest()
+    # Stamps are time.time_ns(); Last-Modified has whole seconds. Rounded up,
+    # and left out until that second is over: a change later in the same
+    # second would otherwise keep the same date and be answered with a 304.
+    last_modified = -(-max(versions.values()) // 10 ** 9)
+    if last_modified > time.time():
+        last_modified = None
+    # Weak: equivalent pages still differ in e.g. their CSRF token
+    return 'W/' + quote_etag(digest), last_modified
+
+
+def conditional_page(tags_func, on_not_modified=None, global_tags=GLOBAL_TAGS):
+    """
+    Answer GET/HEAD revalidations with 304 Not Modified. tags_func(request,
+    *args, **kwargs) returns the tags the page is built from, or None when
+    it cannot tell (the view then runs normally); global_tags are added.
+    on_not_modified(request, tags) runs for every 304.
+
+    Only revalidations (If-None-Match / If-Modified-Since) look the tags up
+    before the view runs. Other responses get their validators from the
+    versions anonymous_page_cache recorded while serving them, so a page
+    cache hit still runs no queries; tags_func is the fallback.
+
+    While an ad slot rotates or is frequency-capped (see ads.rotation),
+    pages showing ads get no validators: a 304 would keep the visitor on
+    the ad they already saw, past its cap.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            if fragments.ADS_TAG in global_tags and fragments.ads_vary():
+                return view(request, *args, **kwargs)
+
+            validators = None
+            if _is_conditional(request):
+                tags = tags_func(request, *args, **kwargs)
+                if tags is not None:
+                    tags = [*global_tags, *tags]
+                    validators = _validators(request, _current_versions(tags))
+                    etag, last_modified = validators
+                    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                    if response is not None:
+                        if response.status_code == 304 and on_not_modified is not None:
+                            on_not_modified(request, tags)
+                        return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if validators is None:
+                versions = _rendered_versions(request)
+                if versions is None:
+                    tags = tags_func(request, *args, **kwargs)
+                    versions = _current_versions([*global_tags, *tags]) if tags is not None else None
+                if versions is None:
+                    return response
+                validators = _validators(request, versions)
+
+            etag, last_modified = validators
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            response.headers.setdefault('ETag', etag)
+            # Replaces e.g. the sitemap's own Last-Modified, so it matches the 304 check above
+            if last_modified is None:
+                response.headers.pop('Last-Modified', None)
+            else:
+                response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,312 @@
+# core/pagination.py
+"""
+Keyset (cursor) pagination for the post listings.
+
+Numbered pages need an OFFSET scan plus a COUNT(*), which gets slower the
+deeper a crawler walks. A cursor instead carries the ordering values of the
+last (or first) row shown, so the next page is a plain indexed range query
+that costs the same on page 400 as on page 1.
+
+Listings keep their numbered pages up to PAGINATION_CURSOR_AFTER; from there
+the "Next" link switches to a cursor, so deep offsets are no longer linked.
+?page= numbers past it are a 404 rather than an OFFSET scan.
+
+Totals are cached per listing filter (category, tag, normalized query) under
+a version stamp that is bumped whenever posts change (see core.signals), and
+large totals are shown rounded ("about 12,000 posts").
+"""
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+
+from .caching import bump_version, versioned_key
+
+COUNTS_NAMESPACE = 'post_counts'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def make_count_key(kind, *parts):
+    """
+    Build the cache key parts for a listing total, e.g. make_count_key('tag', slug).
+    Free text is hashed so any query makes a valid cache key.
+    """
+    text = '\x1f'.join(str(part) for part in parts)
+    return (kind, hashlib.md5(text.encode()).hexdigest())
+
+
+def cached_count(queryset, key):
+    """Return queryset.count(), cached under key until posts change."""
+    cache_key = versioned_key(COUNTS_NAMESPACE, *key)
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, settings.PAGINATION_COUNT_TIMEOUT)
+    return count
+
+
+def invalidate_counts():
+    bump_version(COUNTS_NAMESPACE)
+
+
+def display_count(count, capped=False):
+    """'95', '1,000+', or 'about 12,000' once count reaches PAGINATION_APPROXIMATE_AFTER."""
+    if capped:
+        return f'{count:,}+'
+    if count < settings.PAGINATION_APPROXIMATE_AFTER:
+        return f'{count:,}'
+    # Two significant digits: 12,345 -> 12,000
+    step = 10 ** max(len(str(count)) - 2, 0)
+    return f'about {round(count / step) * step:,}'
+
+
+class CachedCountPaginator(Paginator):
+    """
+    A numbered Paginator whose total comes from cached_count(). With no
+    count_key it counts like the stock Paginator.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return self.exact_count
+        return cached_count(self.object_list, self.count_key)
+
+    @cached_property
+    def exact_count(self):
+        """Uncached COUNT(*), for callers that explicitly need it."""
+        return super().count
+
+
+class CursorPaginator:
+    """
+    Paginates a queryset by the values of its order_by() fields. The last
+    ordering field must be unique (e.g. '-id') so every row has one position.
+    """
+
+    def __init__(self, object_list, per_page, count_limit=None, count_key=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.count_limit = count_limit if count_limit is not None else settings.PAGINATION_COUNT_LIMIT
+        self.count_key = count_key
+        self.ordering = [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in object_list.query.order_by
+        ]
+
+    def _to_python(self, name, value):
+        if value is None:
+            raise ValueError(f'{name}: null cursor value')
+        try:
+            field = self.object_list.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotation (e.g. a search score): only plain numbers may reach .filter()
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'{name}: {value!r} is not a number')
+            return value
+        return field.to_python(value)
+
+    def cursor_for(self, obj, previous=False):
+        values = []
+        for name, _ in self.ordering:
+            value = getattr(obj, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()  # keeps microseconds, unlike DjangoJSONEncoder
+            values.append(value)
+        payload = json.dumps({'p': int(previous), 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = payload['v']
+            if len(values) != len(self.ordering):
+                raise InvalidCursor(token)
+            values = [self._to_python(name, value) for (name, _), value in zip(self.ordering, values)]
+            return bool(payload['p']), values
+        except (ValueError, TypeError, KeyError, ValidationError) as e:
+            raise InvalidCursor(token) from e
+
+    def _keyset_filter(self, values, previous):
+        """Rows strictly after (or before) the cursor position."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != previous else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def page(self, token):
+        previous, values = self.decode_cursor(token)
+        queryset = self.object_list.filter(self._keyset_filter(values, previous))
+        if previous:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if previous:
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=has_more)
+        return CursorPage(rows, self, has_next=has_more, has_previous=True)
+
+    @cached_property
+    def _bounded_count(self):
+        if not self.count_limit:
+            queryset, key = self.object_list, self.count_key
+        else:
+            # COUNT over a LIMITed subquery stops scanning after count_limit + 1 rows
+            queryset = self.object_list[:self.count_limit + 1]
+            key = self.count_key and (*self.count_key, 'max', self.count_limit)
+        if key is None:
+            return queryset.count()
+        return cached_count(queryset, key)
+
+    @property
+    def count(self):
+        """Total rows, counted no further than count_limit (0 disables the cap)."""
+        if self.count_is_capped:
+            return self.count_limit
+        return self._bounded_count
+
+    @property
+    def count_is_capped(self):
+        return bool(self.count_limit) and self._bounded_count > self.count_limit
+
+    @cached_property
+    def exact_count(self):
+        """Uncached, uncapped COUNT(*), for callers that explicitly need it."""
+        return self.object_list.count()
+
+
+class CursorPage:
+    is_cursor = True
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        return self.paginator.cursor_for(self.object_list[-1]) if self._has_next else None
+
+    @cached_property
+    def previous_cursor(self):
+        return self.paginator.cursor_for(self.object_list[0], previous=True) if self._has_previous else None
+
+
+def paginate(request, queryset, per_page, paginator=None, extra_params=None, count_key=None):
+    """
+    Paginate a listing. ?cursor= selects keyset mode; otherwise the usual
+    numbered pages are served (page 1 for junk, the last page when out of
+    range, a 404 past PAGINATION_CURSOR_AFTER). `paginator` lets callers
+    supply a prebuilt numbered paginator over the same ordering (e.g. the
+    homepage snapshot). `count_key` (see make_count_key()) caches the
+    listing total.
+
+    Sets on the returned page:
+      is_cursor            -- True for keyset pages
+      extra_querystring    -- '&q=...' to append to numbered links
+      previous_querystring / next_querystring -- ready-made link targets
+      last_numbered_page   -- highest page number still linked by number
+      display_count        -- the total as shown to visitors
+    """
+    extra_params = {key: value for key, value in (extra_params or {}).items() if value}
+    extra = ('&' + urlencode(extra_params)) if extra_params else ''
+    cursor_paginator = CursorPaginator(queryset, per_page, count_key=count_key)
+
+    token = request.GET.get('cursor')
+    page_obj = None
+    if token:
+        try:
+            page_obj = cursor_paginator.page(token)
+        except InvalidCursor:
+            page_obj = None
+
+    if page_obj is not None:
+        page_obj.previous_querystring = f'cursor={page_obj.previous_cursor}{extra}' if page_obj.has_previous() else ''
+        page_obj.next_querystring = f'cursor={page_obj.next_cursor}{extra}' if page_obj.has_next() else ''
+        page_obj.display_count = display_count(cursor_paginator.count, cursor_paginator.count_is_capped)
+    else:
+        paginator = paginator or CachedCountPaginator(queryset, per_page, count_key=count_key)
+        page_number = request.GET.get('page', 1)
+        try:
+            if int(page_number) > settings.PAGINATION_CURSOR_AFTER:
+                # Only cursors go that deep (see the "Next" link below)
+                raise Http404('Page not found')
+        except ValueError:
+            pass  # served as page 1 below
+        try:
+            page_obj = paginator.page(page_number)
+        except PageNotAnInteger:
+            page_obj = paginator.page(1)
+        except EmptyPage:
+            page_obj = paginator.page(paginator.num_pages)
+
+        page_obj.is_cursor = False
+        page_obj.last_numbered_page = min(paginator.num_pages, settings.PAGINATION_CURSOR_AFTER)
+        page_obj.previous_querystring = (
+            f'page={page_obj.previous_page_number()}{extra}' if page_obj.has_previous() else ''
+        )
+        if not page_obj.has_next():
+            page_obj.next_querystring = ''
+        elif page_obj.number >= settings.PAGINATION_CURSOR_AFTER:
+            last = page_obj[len(page_obj) - 1]
+            page_obj.next_querystring = f'cursor={cursor_paginator.cursor_for(last)}{extra}'
+        else:
+            page_obj.next_querystring = f'page={page_obj.next_page_number()}{extra}'
+        page_obj.display_count = display_count(paginator.count)
+
+    page_obj.extra_querystring = extra
+    return page_obj.paginator, page_obj
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that paginates through paginate() above."""
+
+    def get_count_key(self):
+        """Cache key parts for the listing total; None counts on every request."""
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page = paginate(self.request, queryset, page_size, count_key=self.get_count_key())
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,226 @@
+# core/prerender.py
+"""
+Static pre-rendering of the pages a release burst hits: the post page, its
+category's first page and the homepage.
+
+Pages are rendered through the normal middleware and views, as an anonymous
+visitor on the current Site's domain, and written to PRERENDER_ROOT as
+<url path>/index.html. Each file is written to a temporary name and
+renamed into place, so the web server never serves a half-written page.
+The front server should serve these files for GET requests without a
+session cookie or query string (?page=, ?cursor=, ?q= ... are rendered by
+Django), and hand everything else to Django, e.g. for nginx:
+
+    location / {
+        set $prerendered /prerendered$uri/index.html;
+        if ($request_method !~ ^(GET|HEAD)$) { set $prerendered /nonexistent; }
+        if ($args) { set $prerendered /nonexistent; }
+        if ($cookie_sessionid) { set $prerendered /nonexistent; }
+        try_files $prerendered @django;
+    }
+
+Static pages carry no CSRF token. The comment form fetches one when it is
+first used (see csrf_token_view), a beacon counts the view that Django no
+longer sees, and the page script fills in the ad slots so they still rotate
+(see core.fragments.render_ad).
+
+`manage.py prerender` renders pages on demand. With PRERENDER_ON_PUBLISH,
+saving or deleting a post re-renders just the pages it appears on; its
+comments and download links re-render its page, a renamed category moves
+its files, and a new trending list re-renders every file (see core.signals
+and core.counters).
+"""
+import io
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve, reverse
+
+from .models import Category, Post
+from .pagecache import CSRF_INPUT_RE
+
+logger = logging.getLogger(__name__)
+
+VIEW_BEACON = (
+    '<script>navigator.sendBeacon && navigator.sendBeacon("{url}");</script>'
+)
+
+_handler = None
+
+
+def _get_handler():
+    global _handler
+    if _handler is None:
+        _handler = BaseHandler()
+        _handler.load_middleware()
+    return _handler
+
+
+def render_path(path):
+    """Render a URL path as an anonymous visitor; returns the response."""
+    host = Site.objects.get_current().domain
+    secure = settings.PRERENDER_URL_SCHEME == 'https'
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '443' if secure else '80',
+        'HTTP_HOST': host,
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': settings.PRERENDER_URL_SCHEME,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+    })
+    request.prerendering = True  # not a real visit: no view is counted
+    return _get_handler().get_response(request)
+
+
+def file_for(path):
+    """The file a URL path is pre-rendered to."""
+    return Path(settings.PRERENDER_ROOT) / path.strip('/') / 'index.html'
+
+
+def write_atomic(target, content):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def prerender(path, post_id=None):
+    """
+    Render one path to its file. Returns True when written; pages that do
+    not render with a 200 are removed so Django serves them instead.
+    """
+    response = render_path(path)
+    if response.status_code != 200:
+        logger.warning(f"Not pre-rendering {path}: status {response.status_code}")
+        remove(path)
+        return False
+
+    content = CSRF_INPUT_RE.sub(rb'\1\3', response.content)
+    if post_id is not None:
+        beacon = VIEW_BEACON.format(url=reverse('count_post_view', args=[post_id])).encode()
+        content = content.replace(b'</body>', beacon + b'</body>', 1)
+    write_atomic(file_for(path), content)
+    return True
+
+
+def remove(path):
+    try:
+        file_for(path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def prerender_post(post):
+    if post.is_published and post.category_id:
+        prerender(post.get_absolute_url(), post_id=post.pk)
+
+
+def prerender_category(category_id):
+    slug = Category.objects.filter(pk=category_id).values_list('slug', flat=True).first()
+    if slug:
+        prerender(reverse('category', args=[slug]))
+
+
+def prerender_home():
+    prerender(reverse('home'))
+
+
+def prerendered_paths():
+    """The URL paths that currently have a pre-rendered file."""
+    root = Path(settings.PRERENDER_ROOT)
+    for file in root.rglob('index.html'):
+        directory = file.parent.relative_to(root).as_posix()
+        yield '/' if directory == '.' else f'/{directory}/'
+
+
+def refresh(path):
+    """Re-render an existing file, with the view beacon for post pages."""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        remove(path)
+        return
+    post_id = None
+    if match.url_name == 'post_detail':
+        post_id = Post.objects.filter(slug=match.kwargs['slug']).values_list('pk', flat=True).first()
+    prerender(path, post_id=post_id)
+
+
+def refresh_all():
+    """Re-render every pre-rendered page, e.g. once the sidebar changed."""
+    for path in list(prerendered_paths()):
+        try:
+            refresh(path)
+        except Exception as e:
+            logger.error(f"Re-rendering {path} failed: {e}")
+
+
+def post_page_changed(post_id):
+    """Re-render a post page after its comments or download links changed."""
+    try:
+        post = Post.objects.filter(pk=post_id).first()
+        if post is not None:
+            prerender_post(post)
+    except Exception as e:
+        logger.error(f"Pre-rendering post {post_id} failed: {e}")
+
+
+def category_renamed(category, old_slug):
+    """
+    Move a renamed category's files: its post pages and its listing are
+    rendered under the new slug, and the old URLs are left to Django, which
+    redirects them.
+    """
+    try:
+        old_dir = Path(settings.PRERENDER_ROOT) / old_slug
+        post_slugs = [file.parent.name for file in old_dir.glob('*/index.html')]
+        for slug in post_slugs:
+            remove(reverse('post_detail', kwargs={'category': old_slug, 'slug': slug}))
+        remove(reverse('category', args=[old_slug]))
+
+        for post in Post.objects.filter(category=category, slug__in=post_slugs):
+            prerender_post(post)
+        prerender_category(category.pk)
+        prerender_home()
+    except Exception as e:
+        logger.error(f"Pre-rendering after renaming category {category.pk} failed: {e}")
+
+
+def post_changed(post, old_url=None, old_category_id=None, deleted=False):
+    """
+    Re-render the pages a post change affects: the post itself, its old and
+    new category pages and the homepage. Unpublished or deleted posts (and
+    a post's previous URL) are removed.
+    """
+    try:
+        current_url = post.get_absolute_url() if post.category_id else None
+        stale = {old_url} - {current_url}
+        if deleted or not post.is_published:
+            stale.add(current_url)
+        for url in stale - {None}:
+            remove(url)
+        if not deleted:
+            prerender_post(post)
+        for category_id in {post.category_id, old_category_id} - {None}:
+            prerender_category(category_id)
+        prerender_home()
+    except Exception as e:
+        # Django still serves anything that could not be pre-rendered
+        logger.error(f"Pre-rendering after a change to post {post.pk} failed: {e}")
@@ -0,0 +1,288 @@
+# core/search.py
+"""
+Full-text search over published posts, backed by the SearchTerm table.
+
+Each post is split into terms (HTML stripped, case-folded) from its title,
+excerpt, content, category name and tag names. A term's weight is the number
+of times it appears, multiplied by the weight of the field it appears in, so
+a title hit outranks a passing mention in the body. A search matches posts
+containing every query term (the last one as a prefix, so partly typed words
+still match) and ranks them by the summed weights.
+
+The index is kept in sync by the signal receivers in core.signals; run
+`manage.py rebuild_search_index` after bulk imports.
+
+Because a few queries make up most searches, each worker also keeps the
+ranked post ids of the queries it has answered, keyed on the normalized
+query (see query_key()). The least frequently used entry is evicted when the
+cache is full, and every index write bumps a shared version stamp that
+empties the caches of all workers. Hit rates and the hottest queries are
+logged every SEARCH_CACHE_LOG_INTERVAL seconds.
+"""
+import html
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+from django.utils.html import strip_tags
+
+from .caching import bump_version, get_version
+from .models import Post, SearchTerm
+
+logger = logging.getLogger(__name__)
+
+SEARCH_NAMESPACE = 'search'
+
+FIELD_WEIGHTS = {
+    'title': 10,
+    'category': 5,
+    'tags': 5,
+    'excerpt': 3,
+    'content': 1,
+}
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+MAX_QUERY_TERMS = 8
+
+STOPWORDS = frozenset('''
+    a an and are as at be but by for from has have in is it its of on or that
+    the this to was were will with
+'''.split())
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text (HTML allowed) into normalized index terms."""
+    if not text:
+        return []
+    text = html.unescape(strip_tags(text)).casefold()
+    return [
+        token for token in TOKEN_RE.findall(text)
+        if MIN_TERM_LENGTH <= len(token) <= MAX_TERM_LENGTH and token not in STOPWORDS
+    ]
+
+
+def post_terms(post):
+    """Return {term: weight} for a post."""
+    fields = {
+        'title': post.title,
+        'category': post.category.name if post.category_id else '',
+        'tags': ' '.join(tag.name for tag in post.tags.all()),
+        'excerpt': post.excerpt,
+        'content': post.content,
+    }
+    weights = Counter()
+    for field, text in fields.items():
+        for term in tokenize(text):
+            weights[term] += FIELD_WEIGHTS[field]
+    return weights
+
+
+def _index_rows(post):
+    if not post.is_published:
+        return []
+    return [SearchTerm(term=term, post=post, weight=weight) for term, weight in post_terms(post).items()]
+
+
+@transaction.atomic
+def index_post(post):
+    """(Re)build the index rows of one post; unpublished posts are removed."""
+    SearchTerm.objects.filter(post=post).delete()
+    SearchTerm.objects.bulk_create(_index_rows(post), batch_size=500)
+    invalidate_search_cache()
+
+
+def index_posts(queryset):
+    """Reindex every post in a queryset (e.g. all posts of a renamed category)."""
+    for post in queryset.select_related('category').prefetch_related('tags').iterator(chunk_size=200):
+        index_post(post)
+
+
+@transaction.atomic
+def rebuild_index():
+    """Drop and rebuild the whole index. Returns (posts indexed, rows written)."""
+    SearchTerm.objects.all().delete()
+    posts = rows = 0
+    published = Post.objects.filter(is_published=True).select_related('category').prefetch_related('tags')
+    for post in published.iterator(chunk_size=200):
+        batch = _index_rows(post)
+        SearchTerm.objects.bulk_create(batch, batch_size=500)
+        posts += 1
+        rows += len(batch)
+    invalidate_search_cache()
+    return posts, rows
+
+
+def query_terms(query):
+    """Distinct terms of a search query, in order, at most MAX_QUERY_TERMS."""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def search_posts(query, queryset=None):
+    """
+    Filter a Post queryset (published posts by default) down to the posts
+    matching every term of query, annotated with `score` and ordered by
+    relevance, newest first among equal scores.
+    """
+    if queryset is None:
+        queryset = Post.objects.filter(is_published=True)
+
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+
+    conditions = [Q(search_terms__term=term) for term in terms[:-1]]
+    conditions.append(Q(search_terms__term__startswith=terms[-1]))
+
+    any_term = Q()
+    for condition in conditions:
+        any_term |= condition
+
+    # One flag per query term, set when any of the post's matched rows
+    # satisfies it; a post must set all of them.
+    flags = {
+        f'match_{i}': Max(Case(When(condition, then=Value(1)), default=Value(0), output_field=IntegerField()))
+        for i, condition in enumerate(conditions)
+    }
+    return queryset.filter(any_term).annotate(
+        score=Sum('search_terms__weight'), **flags
+    ).filter(
+        **{name: 1 for name in flags}
+    ).order_by('-score', '-published_date', '-id')
+
+
+def query_key(query):
+    """
+    The normalized form of a query: case-folded, punctuation and whitespace
+    collapsed, stopwords dropped. Queries with the same key have the same
+    results, e.g. "The Squid  Game!" and "squid game".
+    """
+    return ' '.join(query_terms(query))
+
+
+class ResultCache:
+    """
+    A small least-frequently-used cache of {query key: result} for one
+    worker, emptied whenever the shared 'search' version moves.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = {}
+        self.uses = Counter()
+        self.version = None
+        self.hits = self.misses = 0
+        self.last_report = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _check_version(self):
+        version = get_version(SEARCH_NAMESPACE)
+        if version != self.version:
+            self.entries.clear()
+            self.uses.clear()
+            self.version = version
+
+    def get(self, key):
+        with self.lock:
+            self._check_version()
+            self.uses[key] += 1
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self.lock:
+            if key not in self.entries and len(self.entries) >= self.maxsize:
+                # Evict the least used entry (ties: the oldest one)
+                coldest = min(self.entries, key=lambda cached: self.uses[cached])
+                del self.entries[coldest]
+            self.entries[key] = value
+            # Forget the use counts of queries that are no longer cached
+            if len(self.uses) > self.maxsize * 4:
+                self.uses = Counter({k: n for k, n in self.uses.items() if k in self.entries})
+
+    def report(self):
+        """Log the hit rate and hottest queries once per SEARCH_CACHE_LOG_INTERVAL."""
+        now = time.monotonic()
+        if now - self.last_report < settings.SEARCH_CACHE_LOG_INTERVAL:
+            return
+        with self.lock:
+            total = self.hits + self.misses
+            if total:
+                hot = ', '.join(f'"{key}" x{uses}' for key, uses in self.uses.most_common(10))
+                logger.info(
+                    f"Search cache: {self.hits}/{total} hits ({self.hits / total:.0%}), "
+                    f"{len(self.entries)} cached queries. Hottest: {hot}"
+                )
+            self.hits = self.misses = 0
+            self.last_report = now
+
+
+result_cache = ResultCache(settings.SEARCH_CACHE_SIZE)
+
+
+def invalidate_search_cache():
+    bump_version(SEARCH_NAMESPACE)
+
+
+def cached_search(query):
+    """
+    Return {'results': [(post_id, score), ...], 'count': total} for query,
+    holding at most SEARCH_CACHE_RESULTS ranked ids. None for empty queries.
+    """
+    key = query_key(query)
+    if not key:
+        return None
+
+    cached = result_cache.get(key)
+    if cached is None:
+        limit = settings.SEARCH_CACHE_RESULTS
+        results = list(search_posts(key).values_list('id', 'score')[:limit])
+        count = len(results) if len(results) < limit else search_posts(key).count()
+        cached = {'results': results, 'count': count}
+        result_cache.set(key, cached)
+    result_cache.report()
+    return cached
+
+
+class CachedSearchPaginator(Paginator):
+    """
+    Numbered pages over a cached_search() result: only the posts of the
+    requested page are loaded, by primary key, in the cached order.
+    """
+
+    def __init__(self, cached, per_page, queryset, **kwargs):
+        super().__init__(cached['results'], per_page, **kwargs)
+        self.queryset = queryset
+        self._count = cached['count']
+
+    @property
+    def count(self):
+        return self._count
+
+    def covers(self, page_number):
+        """Whether the cached ids reach the end of this page."""
+        try:
+            number = int(page_number)
+        except (TypeError, ValueError):
+            number = 1
+        return len(self.object_list) == self.count or number * self.per_page <= len(self.object_list)
+
+    def _get_page(self, rows, number, paginator):
+        posts = self.queryset.in_bulk([pk for pk, _ in rows])
+        page_posts = []
+        for pk, score in rows:
+            if pk in posts:
+                posts[pk].score = score
+                page_posts.append(posts[pk])
+        return super()._get_page(page_posts, number, paginator)
@@ -0,0 +1,93 @@
+# core/sidebar.py
+"""
+Builds the sidebar block (recent posts, popular tags) shared by every page and
+keeps it in the cache until a post or tag changes.
+
+The trending list is cached on its own 'trending' stamp: it changes with the
+view counts, up to once per counter flush, and is filled into pages as a late
+fragment (see core.fragments) so those refreshes leave cached pages alone.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from taggit.models import Tag
+
+from .caching import bump_version, versioned_key
+from .models import Post
+from .trending import DEFAULT_TIME_FRAME, TIME_FRAMES, get_trending_ids
+
+SIDEBAR_NAMESPACE = 'sidebar'
+TRENDING_NAMESPACE = 'trending'
+
+
+def build_trending(time_frame):
+    """The trending posts of a time frame, as a plain list ready to be cached."""
+    published = Post.objects.cards().filter(is_published=True)
+
+    # Ranked by views inside the window (see core.trending)
+    trending_ids = get_trending_ids(time_frame)
+    if trending_ids:
+        by_id = published.in_bulk(trending_ids)
+        trending_posts = [by_id[pk] for pk in trending_ids if pk in by_id]
+    else:
+        # No view stats recorded yet: fall back to recent posts by total views
+        time_threshold = timezone.now() - TIME_FRAMES[time_frame]
+        trending_posts = list(
+            published.filter(published_date__gte=time_threshold).order_by('-views')[:settings.TRENDING_SIZE]
+        )
+    return trending_posts
+
+
+def build_sidebar():
+    """Run the sidebar queries and return plain lists ready to be cached."""
+    published = Post.objects.cards().filter(is_published=True)
+    recent_posts = list(published.order_by('-published_date')[:10])
+
+    # Join through the tagged items straight to published posts instead of
+    # building a subquery over every post id.
+    popular_tags = list(
+        Tag.objects.filter(post__is_published=True)
+        .annotate(num_times=Count('post'))
+        .order_by('-num_times')[:10]
+    )
+
+    return {
+        'recent_posts': recent_posts,
+        'popular_tags': popular_tags,
+    }
+
+
+def time_frame_or_default(time_frame):
+    return time_frame if time_frame in TIME_FRAMES else DEFAULT_TIME_FRAME
+
+
+def get_sidebar():
+    """Return the cached sidebar block, building it on a miss."""
+    key = versioned_key(SIDEBAR_NAMESPACE)
+    sidebar = cache.get(key)
+    if sidebar is None:
+        sidebar = build_sidebar()
+        cache.set(key, sidebar, settings.SIDEBAR_CACHE_TIMEOUT)
+    return sidebar
+
+
+def get_trending(time_frame=DEFAULT_TIME_FRAME):
+    """Return the cached trending posts of a time frame, building them on a miss."""
+    time_frame = time_frame_or_default(time_frame)
+    key = versioned_key(TRENDING_NAMESPACE, time_frame)
+    trending_posts = cache.get(key)
+    if trending_posts is None:
+        trending_posts = build_trending(time_frame)
+        cache.set(key, trending_posts, settings.SIDEBAR_CACHE_TIMEOUT)
+    return trending_posts
+
+
+def invalidate_trending():
+    bump_version(TRENDING_NAMESPACE)
+
+
+def invalidate_sidebar():
+    # Trending shows post titles and thumbnails too
+    bump_version(SIDEBAR_NAMESPACE)
+    invalidate_trending()
@@ -147,3 +147,307 @@ def shorten_subtitle_url(sender, instance, **kwargs):
             instance.download_url,
             f"{instance.post.title} {instance.language} Subtitle"
         )
+
+
+# --- Sidebar cache invalidation ---
+# Stamps are bumped once the change commits: bumped earlier, another worker
+# could rebuild from the old rows and store them under the new stamp.
+from django.db import transaction
+from django.db.models.signals import post_delete, m2m_changed
+from taggit.models import Tag
+
+from .sidebar import invalidate_sidebar
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_sidebar_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_sidebar)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_sidebar_on_tag_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(invalidate_sidebar)
+
+
+# --- Homepage snapshot invalidation ---
+from .homepage import invalidate_homepage
+from .models import Category, HomepageSection
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=HomepageSection)
+@receiver(post_delete, sender=HomepageSection)
+def invalidate_homepage_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_homepage)
+
+
+@receiver(m2m_changed, sender=HomepageSection.categories.through)
+def invalidate_homepage_on_section_categories_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(invalidate_homepage)
+
+
+# --- Listing count invalidation ---
+from .pagination import invalidate_counts
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_counts_on_change(sender, **kwargs):
+    transaction.on_commit(invalidate_counts)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_counts_on_tag_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(invalidate_counts)
+
+
+# --- Search index maintenance ---
+from .search import index_post, index_posts
+
+
+@receiver(post_save, sender=Post)
+def index_post_on_save(sender, instance, **kwargs):
+    index_post(instance)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def index_post_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        index_post(instance)
+    elif pk_set:
+        index_posts(Post.objects.filter(pk__in=pk_set))
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Tag)
+def remember_indexed_name(sender, instance, **kwargs):
+    # Only a rename changes the indexed terms of the related posts
+    if instance.pk:
+        instance._indexed_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_posts(sender, instance, created, **kwargs):
+    if not created and instance.name != getattr(instance, '_indexed_name', None):
+        index_posts(Post.objects.filter(category=instance, is_published=True))
+
+
+@receiver(post_save, sender=Tag)
+def reindex_tag_posts(sender, instance, created, **kwargs):
+    if not created and instance.name != getattr(instance, '_indexed_name', None):
+        index_posts(Post.objects.filter(tags=instance, is_published=True))
+
+
+# --- Search suggestions ---
+from .suggest import post_changed
+
+
+@receiver(post_save, sender=Post)
+def update_suggestions_on_save(sender, instance, **kwargs):
+    post_changed(instance)
+
+
+@receiver(post_delete, sender=Post)
+def update_suggestions_on_delete(sender, instance, **kwargs):
+    post_changed(instance, deleted=True)
+
+
+# --- Full-page cache purging ---
+from django.db import transaction
+from django.db.models.signals import pre_delete
+
+from ads.models import Ad
+
+from .models import Comment, Media, Page, SiteSettings
+from .fragments import ADS_TAG, comments_tag
+from .pagecache import SITEMAP_TAG, category_tag, page_tag, post_tag, purge, tag_tag
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    # A post moved to another category also leaves the old category's pages
+    if instance.pk:
+        instance._cached_category_id = Post.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def purge_pages_on_post_save(sender, instance, **kwargs):
+    tags = {post_tag(instance.pk), category_tag(instance.category_id)}
+    if getattr(instance, '_cached_category_id', None):
+        tags.add(category_tag(instance._cached_category_id))
+    tags.update(tag_tag(pk) for pk in instance.tags.values_list('pk', flat=True))
+    # After the commit, like every purge below: a page re-rendered in between
+    # would otherwise be cached from the old rows under the new version
+    transaction.on_commit(lambda: purge(*tags))
+
+
+@receiver(pre_delete, sender=Post)
+def purge_pages_on_post_delete(sender, instance, **kwargs):
+    # pre_delete: the post's tags are gone by post_delete
+    tags = [post_tag(instance.pk), category_tag(instance.category_id),
+            *(tag_tag(pk) for pk in instance.tags.values_list('pk', flat=True))]
+    transaction.on_commit(lambda: purge(*tags))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def purge_pages_on_tag_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance is a Tag, pk_set holds post ids
+        tag_pks, post_pks = [instance.pk], pk_set or Post.objects.filter(tags=instance).values_list('pk', flat=True)
+    else:
+        tag_pks, post_pks = pk_set or instance.tags.values_list('pk', flat=True), [instance.pk]
+    tags = [*(tag_tag(pk) for pk in tag_pks), *(post_tag(pk) for pk in post_pks)]
+    transaction.on_commit(lambda: purge(*tags))
+
+
+@receiver(post_save, sender=DownloadQuality)
+@receiver(post_delete, sender=DownloadQuality)
+@receiver(post_save, sender=Subtitle)
+@receiver(post_delete, sender=Subtitle)
+def purge_post_page(sender, instance, **kwargs):
+    transaction.on_commit(lambda: purge(post_tag(instance.post_id)))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_post_comments(sender, instance, **kwargs):
+    # Only the comment list fragment; cached post pages stay valid
+    transaction.on_commit(lambda: purge(comments_tag(instance.post_id)))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category_pages(sender, instance, **kwargs):
+    tag = category_tag(instance.pk)  # the pk is cleared once deleted
+    transaction.on_commit(lambda: purge(tag))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def purge_tag_pages(sender, instance, **kwargs):
+    tag = tag_tag(instance.pk)
+    transaction.on_commit(lambda: purge(tag))
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def purge_static_page(sender, instance, **kwargs):
+    tag = page_tag(instance.pk)
+    transaction.on_commit(lambda: purge(tag))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def purge_sitemap(sender, **kwargs):
+    transaction.on_commit(lambda: purge(SITEMAP_TAG))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def purge_sitemap_on_tag_change(sender, action, **kwargs):
+    # The tag sitemap lists the tags of published posts
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: purge(SITEMAP_TAG))
+
+
+@receiver(post_save, sender=Ad)
+@receiver(post_delete, sender=Ad)
+def purge_pages_on_ad_change(sender, **kwargs):
+    # Reloads every worker's ad registry and changes the validators of every page.
+    # After the commit: a registry reloading earlier would keep the old ads
+    # under the new version until the next edit.
+    transaction.on_commit(lambda: purge(ADS_TAG))
+
+
+@receiver(post_save, sender=SiteSettings)
+def purge_pages_on_site_settings_change(sender, **kwargs):
+    transaction.on_commit(lambda: purge('site'))
+
+
+@receiver(post_save, sender=Media)
+@receiver(post_delete, sender=Media)
+def purge_media_pages(sender, **kwargs):
+    transaction.on_commit(lambda: purge('media'))
+
+
+# --- Static pre-rendering on publish ---
+from django.db import transaction
+
+from . import prerender
+
+
+@receiver(pre_save, sender=Post)
+def remember_prerendered_url(sender, instance, **kwargs):
+    if settings.PRERENDER_ON_PUBLISH and instance.pk:
+        old = Post.objects.filter(pk=instance.pk).values('slug', 'category_id', 'category_slug').first()
+        if old and old['category_id'] and old['category_slug']:
+            instance._prerendered_url = reverse('post_detail', kwargs={'category': old['category_slug'], 'slug': old['slug']})
+            instance._prerendered_category_id = old['category_id']
+
+
+@receiver(post_save, sender=Post)
+def prerender_on_save(sender, instance, **kwargs):
+    if settings.PRERENDER_ON_PUBLISH:
+        # After commit, so the render sees the saved post and its tags
+        transaction.on_commit(lambda: prerender.post_changed(
+            instance,
+            old_url=getattr(instance, '_prerendered_url', None),
+            old_category_id=getattr(instance, '_prerendered_category_id', None),
+        ))
+
+
+@receiver(post_delete, sender=Post)
+def prerender_on_delete(sender, instance, **kwargs):
+    if settings.PRERENDER_ON_PUBLISH:
+        transaction.on_commit(lambda: prerender.post_changed(instance, deleted=True))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=DownloadQuality)
+@receiver(post_delete, sender=DownloadQuality)
+@receiver(post_save, sender=Subtitle)
+@receiver(post_delete, sender=Subtitle)
+def prerender_post_page(sender, instance, **kwargs):
+    # The comment list and download links are part of the static post page
+    if settings.PRERENDER_ON_PUBLISH:
+        transaction.on_commit(lambda: prerender.post_page_changed(instance.post_id))
+
+
+# --- Download link cache ---
+from . import downloads
+
+
+@receiver(post_save, sender=DownloadQuality)
+@receiver(post_delete, sender=DownloadQuality)
+def forget_quality_url(sender, instance, **kwargs):
+    # After the commit, or a redirect in between would cache the old link again
+    transaction.on_commit(lambda: downloads.forget('quality', instance.pk))
+
+
+@receiver(post_save, sender=Subtitle)
+@receiver(post_delete, sender=Subtitle)
+def forget_subtitle_url(sender, instance, **kwargs):
+    transaction.on_commit(lambda: downloads.forget('subtitle', instance.pk))
@@ -0,0 +1,146 @@
+# core/suggest.py
+"""
+Search-as-you-type suggestions from an in-process prefix index.
+
+Every worker keeps a sorted array of keys built from the titles of the most
+recent SUGGEST_MAX_POSTS published posts: the whole title plus the title
+starting at each later word, so "game se" finds "Squid Game Season 2". A
+lookup is a binary search followed by a short scan, with no database or
+cache round trip besides one version check.
+
+A Post change updates the index of the worker that saved it in place and
+bumps a shared version stamp; the other workers rebuild theirs on their next
+lookup.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.urls import reverse
+
+from .caching import bump_version, get_version
+from .models import Post
+
+SUGGEST_NAMESPACE = 'suggest'
+
+MAX_WORDS_PER_TITLE = 8
+MAX_SCAN = 200
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Case-folded words joined by single spaces, punctuation dropped."""
+    return ' '.join(WORD_RE.findall(text.casefold()))
+
+
+def title_keys(title):
+    words = normalize(title).split()
+    return [' '.join(words[i:]) for i in range(min(len(words), MAX_WORDS_PER_TITLE))]
+
+
+class SuggestIndex:
+    """
+    Sorted (key, post_id) pairs plus one (title, category slug, slug, rank,
+    whole-title key) record per post; rank orders results newest first.
+    """
+
+    def __init__(self, rows=()):
+        self.posts = {}
+        self.entries = []
+        self.newest_rank = 0
+        for rank, (post_id, title, category_slug, slug) in enumerate(rows):
+            keys = title_keys(title)
+            self.posts[post_id] = (title, category_slug, slug, rank, keys[0] if keys else '')
+            self.entries.extend((key, post_id) for key in keys)
+        self.entries.sort()
+
+    def remove(self, post_id):
+        record = self.posts.pop(post_id, None)
+        if record is None:
+            return
+        for key in title_keys(record[0]):
+            i = bisect_left(self.entries, (key, post_id))
+            if i < len(self.entries) and self.entries[i] == (key, post_id):
+                del self.entries[i]
+
+    def add(self, post_id, title, category_slug, slug):
+        # Newly saved posts rank ahead of everything loaded at build time
+        self.newest_rank -= 1
+        keys = title_keys(title)
+        self.posts[post_id] = (title, category_slug, slug, self.newest_rank, keys[0] if keys else '')
+        for key in keys:
+            insort(self.entries, (key, post_id))
+
+    def lookup(self, query, limit):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        # Posts whose title starts with the query come first, then posts
+        # where a later word does; newest first within each group
+        matches = {}
+        i = bisect_left(self.entries, (prefix,))
+        for key, post_id in self.entries[i:i + MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            _, _, _, rank, whole_title_key = self.posts[post_id]
+            matches[post_id] = (key != whole_title_key, rank)
+
+        best = sorted(matches, key=matches.get)[:limit]
+        return [self.posts[post_id][:3] for post_id in best]
+
+
+def load_rows():
+    return Post.objects.filter(
+        is_published=True, category__isnull=False
+    ).order_by('-published_date', '-id').values_list(
+        'id', 'title', 'category_slug', 'slug'
+    )[:settings.SUGGEST_MAX_POSTS]
+
+
+_lock = threading.Lock()
+_index = None
+_version = None
+
+
+def get_index():
+    """Return this worker's index, rebuilding it when the shared version moved."""
+    global _index, _version
+    version = get_version(SUGGEST_NAMESPACE)
+    if _index is None or version != _version:
+        with _lock:
+            if _index is None or version != _version:
+                _index = SuggestIndex(load_rows())
+                _version = version
+    return _index
+
+
+def invalidate_suggestions():
+    """Make every worker rebuild its index, e.g. after a bulk update of posts."""
+    bump_version(SUGGEST_NAMESPACE)
+
+
+def post_changed(post, deleted=False):
+    """Apply one post change to this worker's index and tell the others."""
+    global _version
+    with _lock:
+        current = _index is not None and _version == get_version(SUGGEST_NAMESPACE)
+        if _index is not None:
+            _index.remove(post.pk)
+            if not deleted and post.is_published and post.category_id:
+                _index.add(post.pk, post.title, post.category_slug, post.slug)
+        version = bump_version(SUGGEST_NAMESPACE)
+        # Only skip our own rebuild if the index was up to date before this change
+        if current:
+            _version = version
+
+
+def suggest(query, limit=None):
+    """Return [{'title': ..., 'url': ...}] for titles matching query."""
+    limit = limit or settings.SUGGEST_LIMIT
+    return [
+        {'title': title, 'url': reverse('post_detail', kwargs={'category': category_slug, 'slug': slug})}
+        for title, category_slug, slug in get_index().lookup(query, limit)
+    ]
@@ -0,0 +1,40 @@
+# core/templatetags/fragment_cache.py
+from django import template
+
+from core.fragments import template_fragment_version, template_fragments
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        key = (self.name, *(str(var.resolve(context)) for var in self.vary_on))
+        version = template_fragment_version(context.get('request'))
+        return template_fragments.get_or_render(key, version, lambda: self.nodelist.render(context))
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    """
+    Cache a block in this worker's memory until the site settings, the
+    active ads or the posts change (see core.fragments):
+
+        {% fragment_cache 'header' query user.is_staff %}
+            ...
+        {% endfragment_cache %}
+
+    Every variable the block's output depends on must be listed after the
+    fragment name.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name.")
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    name = parser.compile_filter(bits[1]).resolve({})
+    return FragmentCacheNode(nodelist, name, [parser.compile_filter(bit) for bit in bits[2:]])
@@ -0,0 +1,16 @@
+# core/templatetags/late_fragments.py
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.fragments import render_fragment
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def late_fragment(context, kind, arg):
+    """
+    {% late_fragment 'ad' 'header1' %} or {% late_fragment 'comments' post.pk %}
+    (see core.fragments).
+    """
+    return mark_safe(render_fragment(context['request'], kind, arg))
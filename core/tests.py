@@ -1,3 +1,269 @@
-from django.test import TestCase
+import base64
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .counters import CLAIMED_SUFFIX, post_views, quality_downloads, subtitle_downloads
+from .models import Category, Comment, DownloadQuality, Post, Subtitle
+from .pagecache import _validators
+from .suggest import suggest
+
+# Already shortened, so saving them makes no shortener call (see core.signals)
+SHORT_URL = 'https://dl.jaraflix.com/abc'
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DownloadCounterTests(TestCase):
+    """Concurrent download clicks are all counted once flushed (core.counters)."""
+
+    WORKERS = 8
+    CLICKS = 250
+
+    def setUp(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        # No spooling or flushing on the request path while the test clicks
+        settings_override = override_settings(COUNTER_SPOOL_DIR=spool.name, COUNTER_SPOOL_INTERVAL=3600)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        author = User.objects.create(username='author')
+        post = Post.objects.create(title='Post', slug='post', content='Body', author=author, is_published=False)
+        self.quality = DownloadQuality.objects.create(post=post, quality='720p', download_url=SHORT_URL)
+        self.subtitle = Subtitle.objects.create(post=post, language='English', download_url=SHORT_URL)
+
+    def test_threads_lose_no_counts(self):
+        def click():
+            for _ in range(self.CLICKS):
+                quality_downloads.incr(self.quality.pk)
+
+        threads = [threading.Thread(target=click) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(quality_downloads.flush(), self.WORKERS * self.CLICKS)
+        self.quality.refresh_from_db()
+        self.assertEqual(self.quality.download_count, self.WORKERS * self.CLICKS)
+
+    def test_processes_lose_no_counts(self):
+        def worker():
+            # Like a Passenger worker: count in memory, then spool a batch
+            for _ in range(self.CLICKS):
+                subtitle_downloads.incr(self.subtitle.pk)
+            subtitle_downloads.spool()
+
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=worker) for _ in range(self.WORKERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(subtitle_downloads.flush(), self.WORKERS * self.CLICKS)
+        self.subtitle.refresh_from_db()
+        self.assertEqual(self.subtitle.download_count, self.WORKERS * self.CLICKS)
+        # Every batch was claimed: a second flush applies nothing
+        self.assertEqual(subtitle_downloads.flush(), 0)
+
+    def test_abandoned_claims_are_recovered(self):
+        # A batch claimed by a flush that crashed before removing it
+        quality_downloads.spool_dir.mkdir(parents=True, exist_ok=True)
+        path = quality_downloads.spool_dir / f"crashed{CLAIMED_SUFFIX}"
+        path.write_text(json.dumps({str(self.quality.pk): 5}))
+        old = time.time() - 2 * settings.COUNTER_FLUSH_INTERVAL
+        os.utime(path, (old, old))
+
+        self.assertEqual(quality_downloads.flush(), 5)
+        self.quality.refresh_from_db()
+        self.assertEqual(self.quality.download_count, 5)
+        self.assertFalse(path.exists())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PageCacheTests(TestCase):
+    """Cached post pages and their validators (core.pagecache)."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        author = User.objects.create(username='author')
+        category = Category.objects.create(name='Movies', slug='movies')
+        self.post = Post.objects.create(
+            title='Post', slug='post', content='Body', author=author, category=category, is_published=True
+        )
+        self.url = self.post.get_absolute_url()
+
+    def test_cache_hit_runs_no_queries(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+    def test_category_rename_refreshes_post_links(self):
+        self.client.get(self.url)
+        self.assertEqual(suggest('post'), [{'title': 'Post', 'url': self.url}])
+
+        self.post.category.slug = 'films'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.category.save()
+
+        self.assertEqual(suggest('post'), [{'title': 'Post', 'url': '/films/post/'}])
+        response = self.client.get('/films/post/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, self.url)
+
+    def test_last_modified_is_never_behind_a_change(self):
+        request = RequestFactory().get(self.url)
+        _, last_modified = _validators(request, {'post:1': time.time_ns()})
+        self.assertIsNone(last_modified)  # a change later this second must still be newer
+
+        second = int(time.time()) - 5
+        _, last_modified = _validators(request, {'post:1': second * 10 ** 9 + 1})
+        self.assertEqual(last_modified, second + 1)
+
+    def test_only_approved_comments_are_shown(self):
+        Comment.objects.create(post=self.post, name='Reader', email='reader@example.com', comment='Pending')
+        Comment.objects.create(
+            post=self.post, name='Reader', email='reader@example.com', comment='Approved', is_approved=True
+        )
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Approved')
+        self.assertNotContains(response, 'Pending')
+
+    def test_revalidation_follows_comments(self):
+        self.client.get(self.url)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, name='Reader', email='reader@example.com', comment='Hi')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PaginationTests(TestCase):
+    """Cursor and numbered listing pages (core.pagination)."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        author = User.objects.create(username='author')
+        category = Category.objects.create(name='Movies', slug='movies')
+        Post.objects.create(
+            title='Post', slug='post', content='Body', author=author, category=category, is_published=True
+        )
+
+    def cursor(self, *values):
+        payload = json.dumps({'p': 0, 'v': list(values)}).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def test_malformed_cursors_fall_back_to_page_one(self):
+        when = '2024-01-01T00:00:00'
+        for url, cursor in [
+            (reverse('home'), self.cursor({'a': 1}, when, when, 1)),
+            (reverse('home'), self.cursor(None, when, when, 1)),
+            (reverse('search'), self.cursor({'a': 1}, when, 1)),
+            (reverse('search'), self.cursor(True, [when], 1)),
+        ]:
+            with self.subTest(url=url, cursor=cursor):
+                response = self.client.get(url, {'q': 'post', 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+
+    def test_deep_page_numbers_are_not_served(self):
+        response = self.client.get(reverse('home'), {'page': settings.PAGINATION_CURSOR_AFTER + 1})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(reverse('home'), {'page': 'junk'}).status_code, 200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ViewBeaconTests(TestCase):
+    """The view beacon of pre-rendered post pages (core.views.count_post_view)."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        settings_override = override_settings(COUNTER_SPOOL_DIR=spool.name, COUNTER_SPOOL_INTERVAL=3600)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        author = User.objects.create(username='author')
+        self.post = Post.objects.create(title='Post', slug='post', content='Body', author=author, is_published=True)
+        self.draft = Post.objects.create(title='Draft', slug='draft', content='Body', author=author, is_published=False)
+
+    def pending_views(self, post):
+        return sum(amount for key, amount in post_views._pending.items() if key.startswith(f'{post.pk}:'))
+
+    def test_one_view_per_client(self):
+        url = reverse('count_post_view', args=[self.post.pk])
+        before = self.pending_views(self.post)
+        for _ in range(3):
+            self.assertEqual(self.client.post(url).status_code, 204)
+        self.client.post(url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(self.pending_views(self.post) - before, 2)
+
+    def test_unpublished_posts_are_not_counted(self):
+        before = self.pending_views(self.draft)
+        self.assertEqual(self.client.post(reverse('count_post_view', args=[self.draft.pk])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('count_post_view', args=[12345])).status_code, 404)
+        self.assertEqual(self.pending_views(self.draft), before)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PrerenderTests(TestCase):
+    """Static files follow the changes they show (core.prerender)."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        settings_override = override_settings(PRERENDER_ROOT=root.name, PRERENDER_ON_PUBLISH=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        author = User.objects.create(username='author')
+        self.category = Category.objects.create(name='Movies', slug='movies')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(
+                title='Post', slug='post', content='Body', author=author, category=self.category, is_published=True
+            )
+
+    def test_renamed_category_moves_its_files(self):
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'movies', 'post', 'index.html')))
+
+        self.category.slug = 'films'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'movies', 'post', 'index.html')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'category', 'movies', 'index.html')))
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'films', 'post', 'index.html')))
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'category', 'films', 'index.html')))
+
+    def test_comments_re_render_the_post_page(self):
+        path = os.path.join(self.root, 'movies', 'post', 'index.html')
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, name='Reader', email='reader@example.com', comment='First!', is_approved=True
+            )
+        with open(path) as fh:
+            self.assertIn('First!', fh.read())
@@ -0,0 +1,154 @@
+# core/trending.py
+"""
+Trending posts ranked by views that happened inside a time window.
+
+Views land in PostViewStat hourly buckets (written by the view counter in
+core.counters). The ranked post ids for each window are precomputed after
+every counter flush and kept in the cache, so rendering the sidebar never
+aggregates the stats table.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import PostViewStat
+
+logger = logging.getLogger(__name__)
+
+TIME_FRAMES = {
+    '24hrs': timedelta(hours=24),
+    '7days': timedelta(days=7),
+}
+DEFAULT_TIME_FRAME = '7days'
+
+TRENDING_KEY = 'trending:{}'
+
+
+def hour_bucket(moment=None):
+    """Epoch seconds of the start of the (UTC) hour containing moment."""
+    moment = moment or timezone.now()
+    return int(moment.timestamp()) // 3600 * 3600
+
+
+def record_hourly_views(totals):
+    """
+    Add {(post_id, hour_epoch): views} to the hourly buckets.
+
+    Called inside the counter flush transaction; flushes of the same counter
+    never overlap, so "update existing rows, insert the rest" is safe.
+    """
+    if not totals:
+        return
+
+    buckets = {key: datetime.fromtimestamp(key[1], tz=dt_timezone.utc) for key in totals}
+    existing = set(
+        PostViewStat.objects.filter(
+            period=PostViewStat.HOUR,
+            bucket__in=set(buckets.values()),
+            post_id__in={post_id for post_id, _ in totals},
+        ).values_list('post_id', 'bucket')
+    )
+
+    # One UPDATE per (bucket, increment) pair; the rest become new rows
+    updates = defaultdict(list)
+    new_rows = []
+    for (post_id, hour), amount in totals.items():
+        bucket = buckets[(post_id, hour)]
+        if (post_id, bucket) in existing:
+            updates[(bucket, amount)].append(post_id)
+        else:
+            new_rows.append(PostViewStat(post_id=post_id, period=PostViewStat.HOUR, bucket=bucket, views=amount))
+
+    for (bucket, amount), post_ids in updates.items():
+        PostViewStat.objects.filter(
+            period=PostViewStat.HOUR, bucket=bucket, post_id__in=sorted(post_ids)
+        ).update(views=F('views') + amount)
+    PostViewStat.objects.bulk_create(new_rows, batch_size=500)
+
+
+def compute_trending(time_frame, limit=None):
+    """Rank published posts by views inside the window. Returns post ids."""
+    limit = limit or settings.TRENDING_SIZE
+    threshold = timezone.now() - TIME_FRAMES[time_frame]
+
+    return list(
+        PostViewStat.objects.filter(bucket__gte=threshold, post__is_published=True)
+        .values('post_id')
+        .annotate(total=Sum('views'))
+        .order_by('-total', '-post_id')
+        .values_list('post_id', flat=True)[:limit]
+    )
+
+
+def refresh_trending():
+    """
+    Recompute every window and store the ranked ids. Returns True when any
+    list changed, so callers can drop caches built from the old lists.
+    """
+    changed = False
+    for time_frame in TIME_FRAMES:
+        key = TRENDING_KEY.format(time_frame)
+        ids = compute_trending(time_frame)
+        if cache.get(key) != ids:
+            changed = True
+        cache.set(key, ids, settings.TRENDING_TIMEOUT)
+    return changed
+
+
+def get_trending_ids(time_frame=DEFAULT_TIME_FRAME):
+    """Return the precomputed ranking, computing it only when it has expired."""
+    if time_frame not in TIME_FRAMES:
+        time_frame = DEFAULT_TIME_FRAME
+
+    key = TRENDING_KEY.format(time_frame)
+    ids = cache.get(key)
+    if ids is None:
+        ids = compute_trending(time_frame)
+        cache.set(key, ids, settings.TRENDING_TIMEOUT)
+    return ids
+
+
+@transaction.atomic
+def compact_view_stats(now=None):
+    """
+    Roll hourly buckets older than VIEW_STATS_HOURLY_DAYS up into daily
+    buckets, and drop daily buckets older than VIEW_STATS_RETENTION_DAYS.
+    Only whole days are rolled up, so a day row never overlaps an hour row.
+    """
+    now = now or timezone.now()
+    today = now.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    hourly_cutoff = today - timedelta(days=settings.VIEW_STATS_HOURLY_DAYS)
+    retention_cutoff = today - timedelta(days=settings.VIEW_STATS_RETENTION_DAYS)
+
+    old_hours = PostViewStat.objects.filter(period=PostViewStat.HOUR, bucket__lt=hourly_cutoff)
+    day_totals = defaultdict(int)
+    for post_id, bucket, views in old_hours.values_list('post_id', 'bucket', 'views').iterator():
+        day = bucket.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        day_totals[(post_id, day)] += views
+
+    existing = set(
+        PostViewStat.objects.filter(
+            period=PostViewStat.DAY,
+            bucket__in={day for _, day in day_totals},
+        ).values_list('post_id', 'bucket')
+    )
+    new_rows = []
+    for (post_id, day), views in day_totals.items():
+        if (post_id, day) in existing:
+            PostViewStat.objects.filter(
+                post_id=post_id, period=PostViewStat.DAY, bucket=day
+            ).update(views=F('views') + views)
+        else:
+            new_rows.append(PostViewStat(post_id=post_id, period=PostViewStat.DAY, bucket=day, views=views))
+    PostViewStat.objects.bulk_create(new_rows, batch_size=500)
+
+    rolled_up, _ = old_hours.delete()
+    expired, _ = PostViewStat.objects.filter(bucket__lt=retention_cutoff).delete()
+    logger.info(f"View stats compacted: {rolled_up} hourly rows rolled up, {expired} expired rows removed.")
+    return rolled_up, expired
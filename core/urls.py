@@ -1,10 +1,13 @@
 from django.urls import path
 from django.views.generic.base import RedirectView
-from .views import home, CategoryView, PostDetailView, search, download_quality, download_subtitle, TagDetailView, PageView, MediaListView, MediaDetailView
+from .views import home, CategoryView, PostDetailView, search, search_suggest, csrf_token_view, count_post_view, download_quality, download_subtitle, TagDetailView, PageView, MediaListView, MediaDetailView
 
 urlpatterns = [
     path('', home, name='home'),
     path('search/', search, name='search'),
+    path('search/suggest/', search_suggest, name='search_suggest'),
+    path('csrf-token/', csrf_token_view, name='csrf_token'),
+    path('views/<int:pk>/', count_post_view, name='count_post_view'),
 
     # ✅ CORRECTED: Use <str:slug> for flexibility
     path('category/<str:slug>/', CategoryView.as_view(), name='category'),
@@ -1,10 +1,25 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView
-from .models import Post, Category, Comment, HomepageSection, DownloadQuality, Subtitle, Media, Page
+from .models import Post, Category, Comment, HomepageSection, Media, Page
 from .forms import CommentForm
+from .caching import versioned_key
+from .counters import post_views, quality_downloads, subtitle_downloads
+from .downloads import download_url
+from .pagination import KeysetPaginationMixin, make_count_key, paginate
+from .search import CachedSearchPaginator, cached_search, query_key, search_posts
+from .suggest import suggest
+from .middleware import session_free
+from .fragments import comments_tag
+from .pagecache import SITEMAP_TAG, anonymous_page_cache, category_tag, conditional_page, page_tag, post_tag, tag_page, tag_tag
+from .homepage import HOME_PAGE_SIZE, SnapshotPaginator, get_homepage_snapshot, get_other_posts, snapshot_page
 from django.db.models import Q
 from django.core.paginator import Paginator
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.middleware.csrf import get_token
+from django.utils.decorators import method_decorator
 from taggit.models import Tag 
 from .sitemaps import PostSitemap, CategorySitemap, TagSitemap, StaticViewSitemap
 from django.contrib.sitemaps.views import sitemap as sitemap_view, index as sitemap_index_view
@@ -13,66 +28,41 @@ from django.urls import reverse
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db.models import Q
 from django.conf import settings
+from django.core.cache import cache
 from django.views.static import serve
 from django.db.models import Case, When, Value, IntegerField, F, Q
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 
+def home_tags(request):
+    # The snapshot and the sidebar; searches also depend on the search index
+    return ['homepage', 'search'] if request.GET.get('q') else ['homepage']
+
+
+@session_free
+@conditional_page(home_tags)
 def home(request):
-    sections = HomepageSection.objects.filter(enabled=True)
-    
-    section_data = []
-    for section in sections:
-        posts = Post.objects.filter(
-            category__in=section.categories.all(),
-            is_published=True
-        ).annotate(
-            # If updated_date > published_date, assign 1 to move it up
-            updated_priority=Case(
-                When(updated_date__gt=F('published_date'), then=Value(1)),
-                default=Value(0),
-                output_field=IntegerField()
-            )
-        ).order_by('-updated_priority', '-published_date', '-updated_date')[:6]
-        
-        section_data.append({
-            'title': section.title,
-            'posts': posts,
-            'id': section.id
-        })
-    
-    section_categories = [cat for section in sections for cat in section.categories.all()]
-    other_posts_queryset = Post.objects.filter(
-        is_published=True
-    ).exclude(
-        category__in=section_categories
-    ).annotate(
-        updated_priority=Case(
-            When(updated_date__gt=F('published_date'), then=Value(1)),
-            default=Value(0),
-            output_field=IntegerField()
-        )
-    ).order_by('-updated_priority', '-published_date', '-updated_date')
-    
-    query = request.GET.get('q')
-    if query:
-        other_posts_queryset = other_posts_queryset.filter(
-            Q(title__icontains=query) | 
-            Q(content__icontains=query) |
-            Q(category__name__icontains=query) |
-            Q(tags__name__icontains=query)
-        ).distinct()
-    
-    paginator = Paginator(other_posts_queryset, 15)
+    query = ' '.join(request.GET.get('q', '').split())
     page_number = request.GET.get('page', 1)
-    try:
-        page_obj = paginator.page(page_number)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages)
+
+    # Sections (and page 1..N of the listing) come from the prebuilt snapshot
+    snapshot = get_homepage_snapshot()
+
+    other_posts_queryset = get_other_posts(snapshot['section_category_ids'])
+    if query:
+        # Ranked by relevance through the search index (see core.search)
+        other_posts_queryset = search_posts(query, other_posts_queryset)
+
+    paginator = None
+    if not query and 'cursor' not in request.GET and snapshot_page(page_number):
+        paginator = SnapshotPaginator(snapshot['posts'], HOME_PAGE_SIZE, count=snapshot['count'])
+    count_key = make_count_key('home', snapshot['section_category_ids'], query_key(query))
+    paginator, page_obj = paginate(
+        request, other_posts_queryset, HOME_PAGE_SIZE, paginator=paginator, extra_params={'q': query},
+        count_key=count_key,
+    )
     
     context = {
-        'sections': section_data,
+        'sections': snapshot['sections'],
         'page_obj': page_obj,
         'query': query,
         'total_posts': paginator.count,
@@ -80,7 +70,15 @@ def home(request):
     
     return render(request, 'core/home.html', context)
 
-class CategoryView(ListView):
+def category_tags(request, slug):
+    pk = Category.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    return [category_tag(pk)] if pk else None
+
+
+@method_decorator(conditional_page(category_tags), name='dispatch')
+@method_decorator(anonymous_page_cache(), name='dispatch')
+class CategoryView(KeysetPaginationMixin, ListView):
+    session_free = True
     model = Post
     template_name = 'core/category.html'
     paginate_by = 15
@@ -88,13 +86,14 @@ class CategoryView(ListView):
     slug_url_kwarg = 'slug'  # Explicitly define the slug parameter name
     
     def get_queryset(self):
-        # Optimized query with select_related and prefetch_related
-        return Post.objects.filter(
+        # Card fields only: the listing never shows the post body
+        return Post.objects.cards().filter(
             category__slug=self.kwargs[self.slug_url_kwarg],
             is_published=True
-        ).select_related('category', 'author')\
-         .prefetch_related('tags', 'qualities', 'subtitles')\
-         .order_by('-published_date')
+        ).order_by('-published_date', '-id')
+
+    def get_count_key(self):
+        return make_count_key('category', self.kwargs[self.slug_url_kwarg])
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -105,6 +104,7 @@ class CategoryView(ListView):
             Category.objects.only('name', 'slug'),
             slug=category_slug
         )
+        tag_page(self.request, category_tag(context['category'].pk))
         
         # Add additional context you might need
         context['page_title'] = f"Posts in {context['category'].name}"
@@ -114,7 +114,24 @@ class CategoryView(ListView):
 
 
 
+def count_cached_post_view(request, tags):
+    # A cached post page still counts as a view (see PostDetailView.get)
+    if getattr(request, 'prerendering', False):
+        return
+    for tag in tags:
+        if tag.startswith('post:'):
+            post_views.incr(int(tag.split(':')[1]))
+
+
+def post_tags(request, slug, category=None):
+    post = Post.objects.filter(slug=slug).values_list('pk', 'category_id').first()
+    return [post_tag(post[0]), category_tag(post[1]), comments_tag(post[0])] if post else None
+
+
+@method_decorator(conditional_page(post_tags, on_not_modified=count_cached_post_view), name='dispatch')
+@method_decorator(anonymous_page_cache(on_hit=count_cached_post_view), name='dispatch')
 class PostDetailView(DetailView):
+    session_free = True
     model = Post
     template_name = 'core/post_detail.html'
     context_object_name = 'post'
@@ -129,17 +146,29 @@ class PostDetailView(DetailView):
             post = get_object_or_404(Post, slug=self.kwargs['slug'])
             
             # SEO: Redirect if category doesn't match (301 permanent)
-            if post.category.slug != self.kwargs['category']:
+            if post.category_slug != self.kwargs['category']:
                 return redirect('post_detail', # Use the name of your URL pattern for the post detail
-                              category=post.category.slug,
+                              category=post.category_slug,
                               slug=post.slug,
                               permanent=True)
             return post
         return get_object_or_404(Post, slug=self.kwargs['slug'])  # Legacy URL
 
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if isinstance(self.object, HttpResponse):
+            return self.object  # redirect to the post's canonical URL
+        response = self.render_to_response(self.get_context_data(object=self.object))
+        # Buffered; written to Post.views in batches (see core.counters).
+        # Pre-rendered copies count their views through count_post_view.
+        if not getattr(request, 'prerendering', False):
+            post_views.incr(self.object.pk)
+        return response
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         post = self.object # 'self.object' is already set by DetailView's get_object()
+        tag_page(self.request, post_tag(post.pk), category_tag(post.category_id))
 
         # --- START: ADDED OG/Twitter Absolute URL Logic ---
         # Calculate absolute URL for the post
@@ -162,7 +191,7 @@ class PostDetailView(DetailView):
 
         # Download-related context
         download_data = {
-            'related_posts': Post.objects.filter(
+            'related_posts': Post.objects.cards().filter(
                 category=post.category,
                 is_published=True
             ).exclude(id=post.id)[:4],
@@ -199,7 +228,7 @@ class PostDetailView(DetailView):
             # Redirect back to the same URL pattern
             if 'category' in self.kwargs:
                 return redirect('post_detail',
-                              category=self.object.category.slug,
+                              category=self.object.category_slug,
                               slug=self.object.slug)
             return redirect('post_detail', slug=self.object.slug)
         
@@ -227,34 +256,31 @@ def search(request):
     
 
 def search(request):  # Renamed to 'search' to match your original function name
-    query = request.GET.get('q', '') # Changed 'query' to 'q' to match your original 'request.GET.get('q', '')'
+    query = ' '.join(request.GET.get('q', '').split()) # Changed 'query' to 'q' to match your original 'request.GET.get('q', '')'
     results = []
     page_obj = None
     is_paginated = False
     
     if query:
-        # Search in title, content, and excerpt fields
-        results = Post.objects.filter(
-            Q(title__icontains=query) | 
-            Q(content__icontains=query) | 
-            Q(excerpt__icontains=query), # Added excerpt field
-            is_published=True  # CHANGED THIS LINE: Used 'is_published' instead of 'status'
-        ).order_by('-published_date')  # Order by newest first
-        
-        # Pagination
-        paginator = Paginator(results, 15)  # Show 15 posts per page
-        page_number = request.GET.get('page')
+        # Search the index built from title, excerpt, content, category and tags,
+        # best matches first (see core.search)
+        results = search_posts(query, Post.objects.cards().filter(is_published=True))
+
+        # Popular queries are answered from the per-worker result cache
+        paginator = None
+        cached = cached_search(query) if 'cursor' not in request.GET else None
+        if cached is not None:
+            paginator = CachedSearchPaginator(cached, 15, Post.objects.cards())
+            if not paginator.covers(request.GET.get('page', 1)):
+                paginator = None
         
-        try:
-            page_obj = paginator.get_page(page_number)
-            results = page_obj.object_list
-            is_paginated = paginator.num_pages > 1
-        except PageNotAnInteger:
-            page_obj = paginator.get_page(1)
-            results = page_obj.object_list
-        except EmptyPage:
-            page_obj = paginator.get_page(paginator.num_pages)
-            results = page_obj.object_list
+        # Pagination: numbered pages first, cursors for deep pages
+        paginator, page_obj = paginate(
+            request, results, 15, paginator=paginator, extra_params={'q': query},  # Show 15 posts per page
+            count_key=make_count_key('search', query_key(query)),
+        )
+        results = page_obj.object_list
+        is_paginated = page_obj.has_other_pages()
     
     context = {
         'query': query,
@@ -264,19 +290,66 @@ def search(request):  # Renamed to 'search' to match your original function name
     }
     
     return render(request, 'core/search.html', context) # Kept your original template name 'core/search.html'
+
+@cache_control(max_age=60)
+def search_suggest(request):
+    """JSON title suggestions for the search box, answered from memory (see core.suggest)."""
+    query = request.GET.get('q', '').strip()
+    results = suggest(query) if len(query) >= 2 else []
+    return JsonResponse({'query': query, 'results': results})
+
+@never_cache
+def csrf_token_view(request):
+    """A CSRF token (and its cookie) for forms on pre-rendered pages."""
+    return JsonResponse({'token': get_token(request)})
+
+def _is_published(pk):
+    # Cached until the post's pages are purged (see core.signals)
+    key = versioned_key(post_tag(pk), 'published')
+    published = cache.get(key)
+    if published is None:
+        published = Post.objects.filter(pk=pk, is_published=True).exists()
+        cache.set(key, published, settings.PAGE_CACHE_TIMEOUT)
+    return published
+
+
+@csrf_exempt
+@require_POST
+def count_post_view(request, pk):
+    """View beacon sent by pre-rendered post pages (see core.prerender)."""
+    if not _is_published(pk):
+        raise Http404("No post with this id.")
+    # One view per client and post every POST_VIEW_BEACON_THROTTLE seconds
+    client = request.META.get('REMOTE_ADDR', '')
+    if cache.add(f'view-beacon:{client}:{pk}', 1, settings.POST_VIEW_BEACON_THROTTLE):
+        post_views.incr(pk)
+    return HttpResponse(status=204)
+
 def download_quality(request, pk):
-    quality = get_object_or_404(DownloadQuality, pk=pk)
-    quality.download_count += 1
-    quality.save()
-    return HttpResponseRedirect(quality.download_url)
+    # Served from the cached link map (see core.downloads); the click is
+    # counted in batches (see core.counters)
+    url = download_url('quality', pk)
+    if url is None:
+        raise Http404("No download with this id.")
+    quality_downloads.incr(pk)
+    return HttpResponseRedirect(url)
 
 def download_subtitle(request, pk):
-    subtitle = get_object_or_404(Subtitle, pk=pk)
-    subtitle.download_count += 1
-    subtitle.save()
-    return HttpResponseRedirect(subtitle.download_url)    
+    url = download_url('subtitle', pk)
+    if url is None:
+        raise Http404("No subtitle with this id.")
+    subtitle_downloads.incr(pk)
+    return HttpResponseRedirect(url)
     
-class TagDetailView(ListView):
+def tag_detail_tags(request, slug):
+    pk = Tag.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    return [tag_tag(pk)] if pk else None
+
+
+@method_decorator(conditional_page(tag_detail_tags), name='dispatch')
+@method_decorator(anonymous_page_cache(), name='dispatch')
+class TagDetailView(KeysetPaginationMixin, ListView):
+    session_free = True
     model = Post
     template_name = 'core/tag_detail.html'
     context_object_name = 'posts'
@@ -284,39 +357,57 @@ class TagDetailView(ListView):
 
     def get_queryset(self):
         tag_slug = self.kwargs['slug']
-        return Post.objects.filter(
+        return Post.objects.cards().filter(
             tags__slug=tag_slug,
             is_published=True
-        ).order_by('-published_date')
+        ).order_by('-published_date', '-id')
+
+    def get_count_key(self):
+        return make_count_key('tag', self.kwargs['slug'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
        
         context['tag'] = Tag.objects.get(slug=self.kwargs['slug']) # This is line 179
+        tag_page(self.request, tag_tag(context['tag'].pk))
         return context
     
 def robots_txt(request):
     return render(request, 'robots.txt', content_type='text/plain')
 
+@anonymous_page_cache()
 def PageView(request, slug):
     page = get_object_or_404(Page, slug=slug, is_published=True)
+    tag_page(request, page_tag(page.pk))
     context = {
         'page': page
     }
     return render(request, 'core/page.html', context)   
 
+def media_tags(request, pk=None):
+    return ['media']
+
+
+@method_decorator(conditional_page(media_tags), name='dispatch')
 class MediaListView(ListView):
     model = Media
     template_name = 'media/media_list.html' # Path to your template
     context_object_name = 'medias' # The name of the variable that will contain the list of media objects in your template
     ordering = ['-uploaded_at'] # Order by most recent upload
 
+@method_decorator(conditional_page(media_tags), name='dispatch')
 class MediaDetailView(DetailView):
     model = Media
     template_name = 'media/media_detail.html' # Path to your template
     context_object_name = 'media_item' # The name of the variable that will contain the single media object
 
+def sitemap_tags(request, section=None, **kwargs):
+    # Post, category, tag and page changes bump it (see core.signals)
+    return [SITEMAP_TAG]
+
+
+@conditional_page(sitemap_tags, global_tags=())
 def styled_sitemap(request):
     """
     Custom view to serve a styled sitemap index for human users.
@@ -0,0 +1,66 @@
+# core/warmup.py
+"""
+Template warmup for freshly spawned workers.
+
+Passenger recycles workers often, and each new one would otherwise parse
+base.html, post_detail.html and the rest from disk on its first requests.
+warm_templates() compiles every template under the TEMPLATE_WARMUP_DIRS
+subdirectories of the project template dirs into the cached template
+loader, so the first request renders from memory like any later one. It is
+called from the WSGI entry points and by `manage.py warm_templates`, which
+also prints the parse time of each template.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine, subdirs=None):
+    """Names of the templates below the given subdirectories of engine.dirs, sorted."""
+    subdirs = subdirs if subdirs is not None else settings.TEMPLATE_WARMUP_DIRS
+    names = set()
+    for template_dir in engine.dirs:
+        root = Path(template_dir)
+        for subdir in subdirs:
+            for path in (root / subdir).rglob('*'):
+                if path.is_file() and not path.name.startswith('.'):
+                    names.add(path.relative_to(root).as_posix())
+    return sorted(names)
+
+
+def warm_templates(subdirs=None):
+    """
+    Compile templates into the cached loader. Returns [(name, seconds)] in
+    parse order; templates that fail to compile are logged and skipped.
+    """
+    engine = engines['django'].engine
+    timings = []
+    for name in template_names(engine, subdirs):
+        start = time.perf_counter()
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as e:
+            logger.error(f"Template warmup: {name} does not compile: {e}")
+            continue
+        timings.append((name, time.perf_counter() - start))
+    return timings
+
+
+def warm_on_boot():
+    """Warm the templates of a new worker when TEMPLATE_WARMUP_ON_BOOT is on."""
+    if not settings.TEMPLATE_WARMUP_ON_BOOT:
+        return
+    try:
+        timings = warm_templates()
+    except Exception as e:
+        # A cold worker is slower, not broken
+        logger.error(f"Template warmup failed: {e}")
+        return
+    total = sum(seconds for _, seconds in timings)
+    slowest = ', '.join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in sorted(timings, key=lambda t: -t[1])[:3])
+    logger.info(f"Warmed {len(timings)} templates in {total * 1000:.1f}ms (slowest: {slowest})")
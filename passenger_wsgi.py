@@ -27,4 +27,9 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'blog_project.settings' # <--- CONFIRM YO
 
 from django.core.wsgi import get_wsgi_application
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Compile the templates before the first request reaches this worker
+from core.warmup import warm_on_boot
+
+warm_on_boot()
\ No newline at end of file